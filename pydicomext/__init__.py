@@ -4,14 +4,25 @@ from pydicomext.patient import Patient
 from pydicomext.study import Study
 from pydicomext.series import Series
 from pydicomext.volume import Volume
+from pydicomext.lazyArray import LazyArray
+from pydicomext.pixelCache import PixelCache, pixelCache
+from pydicomext.headerDataset import HeaderDataset, readHeader
+from pydicomext.frameDataset import FrameDataset
+from pydicomext.deferredDataset import DeferredDataset
 
-from pydicomext.loadDirectory import loadDirectory
+from pydicomext.loadDirectory import loadDirectory, iterDirectory, iterSeries
+from pydicomext.loadDirectoryAsync import loadDirectoryAsync
+from pydicomext.loadDICOMDIR import loadDICOMDIR
+from pydicomext.catalog import saveCatalog, loadCatalog
+from pydicomext.directoryIndex import DirectoryIndex
 from pydicomext.combineSeries import combineSeries
 from pydicomext.sortSeries import sortSeries
 from pydicomext.merge import mergeSeries, mergeDatasets
 
 from pydicomext.util import VolumeType, MethodType, isMethodValid, getBestMethods
 
-__all__ = ['DicomDir', 'Patient', 'Study', 'Series', 'Volume', 'VolumeType', 'MethodType', 'loadDirectory',
-           'combineSeries', 'sortSeries', 'mergeSeries', 'mergeDatasets', 'isMethodValid', 'getBestMethods',
-           '__version__']
+__all__ = ['DicomDir', 'Patient', 'Study', 'Series', 'Volume', 'LazyArray', 'PixelCache', 'pixelCache',
+           'HeaderDataset', 'FrameDataset', 'DeferredDataset', 'VolumeType', 'MethodType', 'loadDirectory',
+           'loadDirectoryAsync', 'loadDICOMDIR', 'saveCatalog', 'loadCatalog', 'iterDirectory', 'iterSeries',
+           'readHeader', 'DirectoryIndex', 'combineSeries', 'sortSeries', 'mergeSeries', 'mergeDatasets',
+           'isMethodValid', 'getBestMethods', '__version__']
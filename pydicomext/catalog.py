@@ -0,0 +1,268 @@
+from collections import OrderedDict
+import json
+import os
+
+from pydicom.dataset import Dataset
+from pydicom.multival import MultiValue
+
+from pydicomext.deferredDataset import DeferredDataset
+from pydicomext.dicomDir import DicomDir
+from pydicomext.frameDataset import FrameDataset
+from pydicomext.patient import Patient
+from pydicomext.readDatasets import readDataset
+from pydicomext.series import Series
+from pydicomext.study import Study
+
+# Version of the catalog file written by saveCatalog, bump this whenever the format changes
+CATALOG_FORMAT_VERSION = 1
+
+# Attribute of each class in the hierarchy along with the keyword of the tag it is read from
+PATIENT_KEYWORDS = OrderedDict([
+    ('name', 'PatientName'), ('ID', 'PatientID'), ('issuerOfID', 'IssuerOfPatientID'),
+    ('birthDate', 'PatientBirthDate'), ('birthTime', 'PatientBirthTime'), ('sex', 'PatientSex'),
+    ('otherIDs', 'OtherPatientIDs'), ('otherNames', 'OtherPatientNames'), ('age', 'PatientAge'),
+    ('size', 'PatientSize'), ('weight', 'PatientWeight'), ('ethnicGroup', 'EthnicGroup'),
+    ('comments', 'PatientComments'), ('identityRemoved', 'PatientIdentityRemoved'), ('position', 'PatientPosition'),
+])
+STUDY_KEYWORDS = OrderedDict([
+    ('ID', 'StudyInstanceUID'), ('date', 'StudyDate'), ('time', 'StudyTime'), ('description', 'StudyDescription'),
+])
+SERIES_KEYWORDS = OrderedDict([
+    ('ID', 'SeriesInstanceUID'), ('date', 'SeriesDate'), ('time', 'SeriesTime'),
+    ('description', 'SeriesDescription'), ('number', 'SeriesNumber'),
+])
+
+
+def saveCatalog(dicomDir, filename):
+    """Save a catalog of the patients, studies and series in a :class:`DicomDir` along with their DICOM files
+
+    The catalog is a JSON file containing the patient, study and series information and the filenames of the DICOM
+    files in each series. Filenames are stored relative to the directory of the catalog when possible, so the catalog
+    can be moved along with the DICOM files.
+
+    The catalog can be loaded using :meth:`loadCatalog` without searching or reading any of the DICOM files.
+
+    Parameters
+    ----------
+    dicomDir : DicomDir
+        Hierarchy to save
+    filename : str
+        Filename of the catalog
+
+    Raises
+    ------
+    Exception
+        If a dataset in the hierarchy was not read from a file
+    """
+
+    directory = os.path.dirname(os.path.abspath(filename))
+
+    patients = []
+    for patient in dicomDir.values():
+        studies = []
+        for study in patient.values():
+            seriess = []
+            for series in study.values():
+                seriess.append({
+                    'attributes': getAttributes(series, SERIES_KEYWORDS),
+                    'files': [getRelativeFilename(filename_, directory) for filename_ in getSeriesFilenames(series)],
+                })
+
+            studies.append({'attributes': getAttributes(study, STUDY_KEYWORDS), 'series': seriess})
+
+        patients.append({'attributes': getAttributes(patient, PATIENT_KEYWORDS), 'studies': studies})
+
+    catalog = {
+        'version': CATALOG_FORMAT_VERSION,
+        'patients': patients,
+    }
+
+    with open(filename, 'w') as file:
+        json.dump(catalog, file)
+
+
+def loadCatalog(filename, headerOnly=False):
+    """Load a catalog that was saved using :meth:`saveCatalog`
+
+    The hierarchy is built from the catalog alone, the DICOM files are not read until a series is sorted or combined.
+    Each series contains a :class:`DeferredDataset` for each of its files, see :meth:`Series.loadDeferred`.
+
+    Parameters
+    ----------
+    filename : str
+        Filename of the catalog
+    headerOnly : bool, optional
+        See :meth:`loadDirectory` for more information on this parameter
+
+    Raises
+    ------
+    Exception
+        If the catalog was written by a newer version of the format
+
+    Returns
+    -------
+    DicomDir
+        Hierarchy of patients, studies and series in the catalog
+    """
+
+    with open(filename, 'r') as file:
+        catalog = json.load(file)
+
+    if catalog.get('version', 0) > CATALOG_FORMAT_VERSION:
+        raise Exception('Catalog was saved with a newer format version (%i): %s' % (catalog['version'], filename))
+
+    directory = os.path.dirname(os.path.abspath(filename))
+    readFunc = readHeader if headerOnly else readDataset
+
+    dicomDir = DicomDir()
+    for patientInfo in catalog['patients']:
+        patient = dicomDir.add(Patient(getAttributesDataset(patientInfo['attributes'])))
+        setEmptyAttributes(patient, patientInfo['attributes'], PATIENT_KEYWORDS)
+
+        for studyInfo in patientInfo['studies']:
+            study = patient.add(Study(getAttributesDataset(studyInfo['attributes'])))
+            setEmptyAttributes(study, studyInfo['attributes'], STUDY_KEYWORDS)
+
+            for seriesInfo in studyInfo['series']:
+                series = study.add(Series(dataset=getAttributesDataset(seriesInfo['attributes'])))
+                setEmptyAttributes(series, seriesInfo['attributes'], SERIES_KEYWORDS)
+                series.extend(DeferredDataset(os.path.join(directory, filename_), readFunc)
+                              for filename_ in seriesInfo['files'])
+                series._isDeferred = True
+
+    return dicomDir
+
+
+def getAttributes(obj, keywords):
+    """Retrieve the attributes of a patient, study or series as a dictionary that can be saved as JSON
+
+    Parameters
+    ----------
+    obj : Patient or Study or Series
+        Object to retrieve the attributes from
+    keywords : OrderedDict(str, str)
+        Name of each attribute along with the keyword of its tag
+
+    Returns
+    -------
+    dict(str, str or list(str))
+        Value of each attribute as a string, or a list of strings for multi-valued attributes, keyed by the keyword of
+        its tag. Attributes that are None are not included
+    """
+
+    attributes = OrderedDict()
+    for name, keyword in keywords.items():
+        value = getattr(obj, name)
+
+        if value is None:
+            continue
+
+        # Values are stored as they appear in the DICOM file, e.g. dates are stored as YYYYMMDD
+        if isinstance(value, (list, tuple, MultiValue)):
+            attributes[keyword] = [str(item) for item in value]
+        else:
+            attributes[keyword] = str(value)
+
+    return attributes
+
+
+def getAttributesDataset(attributes):
+    """Create a dataset from attributes retrieved using :meth:`getAttributes`
+
+    The dataset is used to create the patient, study or series in the same manner as when reading the DICOM files, so
+    the values are converted to the same types.
+
+    Parameters
+    ----------
+    attributes : dict(str, str or list(str))
+        Value of each attribute keyed by the keyword of its tag
+
+    Returns
+    -------
+    pydicom.Dataset
+        Dataset containing the attributes
+    """
+
+    dataset = Dataset()
+    for keyword, value in attributes.items():
+        setattr(dataset, keyword, value)
+
+    return dataset
+
+
+def setEmptyAttributes(obj, attributes, keywords):
+    """Restore the attributes of a patient, study or series that were saved as empty strings
+
+    pydicom converts empty values of some VRs, such as dates and times, to None when they are set on a dataset, so
+    these are restored as empty strings to match the values read from the DICOM files.
+
+    Parameters
+    ----------
+    obj : Patient or Study or Series
+        Object to set the attributes on
+    attributes : dict(str, str or list(str))
+        Value of each attribute keyed by the keyword of its tag
+    keywords : OrderedDict(str, str)
+        Name of each attribute along with the keyword of its tag
+    """
+
+    for name, keyword in keywords.items():
+        if attributes.get(keyword) == '':
+            setattr(obj, name, '')
+
+
+def getSeriesFilenames(series):
+    """Retrieve the filenames of the DICOM files in a series
+
+    Parameters
+    ----------
+    series : Series
+        Series to retrieve the filenames of
+
+    Raises
+    ------
+    Exception
+        If a dataset in the series was not read from a file
+
+    Returns
+    -------
+    list(str)
+        Filenames in the order of the datasets in the series, each multi-frame file is only included once
+    """
+
+    filenames = OrderedDict()
+    for dataset in series:
+        if isinstance(dataset, FrameDataset):
+            dataset = dataset.parent
+
+        # Deferred datasets have a filename without reading the file
+        filename = getattr(dataset, 'filename', None)
+        if not isinstance(filename, str):
+            raise Exception('Dataset was not read from a file and cannot be saved in a catalog: %s' % dataset)
+
+        filenames[filename] = None
+
+    return list(filenames)
+
+
+def getRelativeFilename(filename, directory):
+    """Retrieve a filename relative to a directory if possible
+
+    Parameters
+    ----------
+    filename : str
+    directory : str
+
+    Returns
+    -------
+    str
+        Filename relative to the directory, or the absolute filename if it is on a different drive than the directory
+    """
+
+    try:
+        return os.path.relpath(os.path.abspath(filename), directory)
+    except ValueError:
+        return os.path.abspath(filename)
+
+
+from .headerDataset import readHeader
@@ -1,6 +1,16 @@
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+import os
+
 import numpy as np
 import pydicom
 
+from pydicomext.geometry import getGantryTilt, getOrientationMatrix, getSliceGaps, getZPositions, isOrientationUniform
+from pydicomext.lazyArray import LazyArray
+from pydicomext.pixelCache import getPixelCacheKey, pixelCache
+from pydicomext.pixelData import checkRescaleDtype, getImageShape, getPixelDtype, getRescaleDtype, readFrames, \
+    readPixelArray, getFrames
 from pydicomext.util import *
 from pydicomext.volume import Volume
 
@@ -8,7 +18,8 @@ pydicom.config.datetime_conversion = True
 
 
 def combineSeries(series, methods=MethodType.Unknown, reverse=False, squeeze=False, warn=True, shapeTolerance=0.01,
-                  spacingTolerance=0.1):
+                  spacingTolerance=0.1, out=None, filename=None, lazy=False, rescale=False, dtype=None, workers=None,
+                  executor=None):
     """Combines a series into an N-D Numpy array and returns some information about the volume
 
     Many of the parameters are from the :meth:`sortSeries` function which this function will call unless the series has
@@ -32,6 +43,30 @@ def combineSeries(series, methods=MethodType.Unknown, reverse=False, squeeze=Fal
     way of representing a point. In a similar manner, the orientation matrix is constructed such that the left column
     is the x cosines, and the right most column is the z cosines.
 
+    The volume is allocated once and each image is decoded directly into it, so the peak memory usage is roughly the
+    size of the volume. Alternatively, the volume can be written into an existing array by specifying :obj:`out` or
+    into a memory-mapped file by specifying :obj:`filename`. A memory-mapped volume allows combining series that are
+    larger than the available memory since the images are decoded and written to the file one at a time.
+
+    If only part of the volume is needed, :obj:`lazy` can be set to create a volume where the data is a
+    :class:`LazyArray`. No images are decoded until the array is indexed and then only the images touched by the index
+    are decoded.
+
+    By default, the volume contains the stored pixel values. If :obj:`rescale` is set, the rescale slope and intercept
+    of each image are applied to the entire volume at once, in place, after all images are decoded. The volume is
+    allocated with a data type that holds the stored and rescaled values exactly (see :meth:`getRescaleDtype`) so that
+    no temporary copy of the volume is needed.
+
+    Decoding compressed images is CPU intensive, so the images can be decoded in parallel by specifying :obj:`workers`
+    or :obj:`executor`. Each worker reads and decodes the images of its datasets from their files, so every dataset
+    must have been read from a file. The decoded images are identical to decoding them serially as long as the
+    datasets match their files. Any changes made to the datasets in memory, such as replacing the pixel data or
+    changing the transfer syntax, are **not** seen by the workers, so decode such datasets serially instead. When
+    writing to a memory-mapped file with :obj:`filename`, the workers write the images directly into the file,
+    otherwise the images are sent back and copied into the volume. When there are fewer multi-frame datasets than
+    workers, such as a single enhanced MR or CT file, the frames of each dataset are split between the workers and
+    each worker decodes only its frames.
+
     Parameters
     ----------
     series : Series
@@ -53,15 +88,54 @@ def combineSeries(series, methods=MethodType.Unknown, reverse=False, squeeze=Fal
     spacingTolerance : float, optional
         See :meth:`sortSeries` for more information on this parameter. Only used if the series has **not** been sorted
         yet.
+    out : numpy.ndarray, optional
+        Array to write the volume into (default is None, which allocates a new array). The shape must be the shape of
+        the series followed by the image shape. If the data type differs from the decoded images, each image is cast to
+        the data type of the array.
+    filename : str, optional
+        Filename to write the volume into as a :class:`numpy.memmap` (default is None, which allocates the volume in
+        memory). The file is created or overwritten and contains the raw volume data in C-order. The data type and
+        shape are the same as when combining into memory.
+    lazy : bool, optional
+        Whether to create a :class:`LazyArray` that decodes images only when they are accessed instead of decoding the
+        entire volume (default is False). Cannot be used with :obj:`out`, :obj:`filename`, :obj:`rescale` or
+        :obj:`dtype`.
+    rescale : bool, optional
+        Whether to apply the Rescale Slope and Rescale Intercept of each image to the volume (default is False). For
+        multi-frame data, these are retrieved from the Pixel Value Transformation Sequence of each frame. Images
+        without a slope or intercept use 1 and 0, respectively.
+    dtype : numpy.dtype, optional
+        Data type of the volume (default is None, which uses the data type of the decoded images, or the narrowest data
+        type that holds the rescaled values exactly if :obj:`rescale` is set). Ignored if :obj:`out` is given. If
+        :obj:`rescale` is set, this data type, or the data type of :obj:`out`, must hold the stored and rescaled values.
+    workers : int, optional
+        Number of processes to use for decoding the images (default is None, which decodes the images serially on the
+        calling thread). Ignored if :obj:`executor` is given. This number of threads is also used to read the files of
+        a deferred series, see :meth:`Series.loadDeferred`.
+    executor : :class:`concurrent.futures.Executor`, optional
+        Executor used to decode the images, such as a :class:`concurrent.futures.ProcessPoolExecutor` (default is
+        None). The files of a deferred series are read using this executor as well. The executor is not shut down
+        after combining.
 
     Raises
     ------
     TypeError
         If the series is empty
+    TypeError
+        If :obj:`out` does not have the shape of the volume, more than one of :obj:`out`, :obj:`filename` and
+        :obj:`lazy` are given or :obj:`lazy` is given with :obj:`rescale` or :obj:`dtype`
+    TypeError
+        If :obj:`rescale` is set and :obj:`dtype`, or the data type of :obj:`out`, cannot hold the stored and rescaled
+        values, see :meth:`checkRescaleDtype`
     Exception
         If datasets do not have the same image shape
     Exception
-        If datasets do not have uniform image spacing or orientation
+        If datasets do not have uniform image spacing or orientation, or have gaps between slices, and :obj:`warn` is
+        False
+    Exception
+        If datasets have a gantry tilt of more than 0.1 degrees within a stack and :obj:`warn` is False. Previously,
+        only a warning was given regardless of :obj:`warn`, so pass :obj:`warn` as True to combine tilted series such
+        as many head CT scans
 
     Returns
     -------
@@ -69,6 +143,9 @@ def combineSeries(series, methods=MethodType.Unknown, reverse=False, squeeze=Fal
         Volume that contains Numpy array, origin, spacing and other relevant information
     """
 
+    # Read any deferred datasets in parallel as well, otherwise sorting reads them one at a time
+    series.loadDeferred(workers, executor)
+
     # If the series has not been sorted yet, then sort it
     # Or, if there are no datasets in the series then throw an error
     if series._shape is None:
@@ -76,36 +153,18 @@ def combineSeries(series, methods=MethodType.Unknown, reverse=False, squeeze=Fal
     elif len(series) == 0:
         raise TypeError('Series must contain at least one dataset')
 
-    # List of variables that are stored from DICOM header
-    imageShapes = []
-    imageSpacings = []
-    imageOrientations = []
-    origin = None
-    images = []
+    # Retrieve the image shape, spacing, orientation and position of each dataset from the metadata table
+    # The image spacing is not required in the DICOM header, so it will default to (1, 1) if not available
+    metadata = series.metadata
+    imageShapes = metadata.imageShapes
+    imageSpacings = np.where(np.isnan(metadata.pixelSpacings), 1.0, metadata.pixelSpacings)
+    imageOrientations = metadata.orientations
 
-    if series.isMultiFrame:
-        # Foreach dataset, store image shape, spacing, orientation and the image data itself
-        # The image spacing is not required in the DICOM header, so it will default to (1, 1) if not available
-        for dataset in series:
-            imageShapes.append(dataset.parent.pixel_array.shape[1:])
-            imageSpacings.append(dataset.PixelMeasuresSequence[0].PixelSpacing if 'PixelSpacing' in
-                                 dataset.PixelMeasuresSequence[0] else (1, 1))
-            imageOrientations.append(dataset.PlaneOrientationSequence[0].ImageOrientationPatient)
-            images.append(dataset.parent.pixel_array[dataset.sliceIndex, None, :, :])
-
-        # Origin for volume is the first series position
-        origin = np.asfarray(series[0].PlanePositionSequence[0].ImagePositionPatient)
-    else:
-        # Foreach dataset, store image shape, spacing, orientation and the image data itself
-        # The image spacing is not required in the DICOM header, so it will default to (1, 1) if not available
-        for dataset in series:
-            imageShapes.append(dataset.pixel_array.shape)
-            imageSpacings.append(dataset.PixelSpacing if 'PixelSpacing' in dataset else (1, 1))
-            imageOrientations.append(dataset.ImageOrientationPatient)
-            images.append(dataset.pixel_array[None, :, :])
+    if np.isnan(imageOrientations).any() or np.isnan(metadata.positions[0]).any():
+        raise Exception('Datasets must have an image orientation and the first dataset must have an image position')
 
-        # Origin for volume is the first series position
-        origin = np.asfarray(series[0].ImagePositionPatient)
+    # Origin for volume is the first series position
+    origin = metadata.positions[0].copy()
 
     # Check all of the image shapes to make sure they can be stacked together
     if not np.allclose(imageShapes, imageShapes[0], rtol=0.01):
@@ -124,7 +183,7 @@ def combineSeries(series, methods=MethodType.Unknown, reverse=False, squeeze=Fal
     # Check image orientations to make sure they are the same, otherwise throw warning/error
     # I cannot think of a use case where there would be different image orientations that would be combined into one
     # volume. It is a weird idea.
-    if not np.allclose(imageOrientations, imageOrientations[0], rtol=0.1):
+    if not isOrientationUniform(imageOrientations, rtol=0.1, atol=1e-8):
         if warn:
             logger.warning('Datasets image orientation are not the same')
             logger.debug('Datasets orientations: %s' % imageOrientations)
@@ -132,8 +191,30 @@ def combineSeries(series, methods=MethodType.Unknown, reverse=False, squeeze=Fal
             logger.debug('Datasets orientations: %s' % imageOrientations)
             raise Exception('Datasets image orientation are not the same')
 
+    # Check that the slices are stacked perpendicular to the image plane and that no slices are missing, the volume
+    # orientation and spacing assume a regular grid. Only the positions that are available are checked.
+    hasPosition = ~np.isnan(metadata.positions).any(axis=1)
+    positions = metadata.positions[hasPosition]
+    gantryTilt = getGantryTilt(imageOrientations[0], positions, metadata.stackIDs[hasPosition])
+    if gantryTilt > 0.1:
+        if warn:
+            logger.warning('Datasets have a gantry tilt of %.2f degrees, the volume orientation does not account for '
+                           'this' % gantryTilt)
+        else:
+            raise Exception('Datasets have a gantry tilt of %.2f degrees, the volume orientation does not account for '
+                            'this' % gantryTilt)
+
+    sliceGaps = getSliceGaps(getZPositions(imageOrientations[0], positions), spacingTolerance)
+    if sliceGaps.size:
+        if warn:
+            logger.warning('Datasets have gaps between slices, there may be missing slices')
+            logger.debug('Slice locations before gaps: %s' % sliceGaps)
+        else:
+            logger.debug('Slice locations before gaps: %s' % sliceGaps)
+            raise Exception('Datasets have gaps between slices, there may be missing slices')
+
     # Use the first values of datasets since we **assume** these are all the same
-    imageShape = imageShapes[0]
+    imageShape = getImageShape(series[0].parent if series.isMultiFrame else series[0])
     imageSpacing = imageSpacings[0]
     imageOrientation = imageOrientations[0]
 
@@ -146,31 +227,371 @@ def combineSeries(series, methods=MethodType.Unknown, reverse=False, squeeze=Fal
     # DICOM & Volume data (origin, orientation, etc)
     spacing = np.flip(series.spacing + tuple(imageSpacing), axis=0)
 
-    # Create 3D volume from stack of 2D images
-    volume = np.vstack(images)
-
     # Ensure that we are able to resize the volume into the correct shape
-    if np.prod(shape) != np.prod(volume.shape):
-        raise Exception('Unable to reshape volume with %i elements into shape %s' % (np.prod(volume.shape), shape))
+    if np.prod(series.shape) != len(series):
+        raise Exception('Unable to reshape volume with %i elements into shape %s' %
+                        (len(series) * np.prod(imageShape), shape))
+
+    if out is not None and out.shape != shape:
+        raise TypeError('Output array has shape %s but the volume has shape %s' % (out.shape, shape))
+    elif (out is not None) + (filename is not None) + bool(lazy) > 1:
+        raise TypeError('Only one of out, filename or lazy can be given')
+    elif lazy and (rescale or dtype is not None):
+        raise TypeError('Rescale and dtype cannot be used with lazy')
+
+    if rescale:
+        # Images without a slope or intercept are left as is
+        slopes = np.where(np.isnan(metadata.rescaleSlopes), 1.0, metadata.rescaleSlopes)
+        intercepts = np.where(np.isnan(metadata.rescaleIntercepts), 0.0, metadata.rescaleIntercepts)
+
+        # The volume is rescaled in place, so an explicit data type must hold every value rather than wrapping around
+        rescaleDataset = series[0].parent if series.isMultiFrame else series[0]
+        if out is not None:
+            checkRescaleDtype(out.dtype, rescaleDataset, slopes, intercepts)
+        elif dtype is not None:
+            checkRescaleDtype(dtype, rescaleDataset, slopes, intercepts)
+        else:
+            dtype = getRescaleDtype(rescaleDataset, slopes, intercepts)
+
+    if lazy:
+        volume = LazyArray(series, imageShape)
+    else:
+        volume = combineImages(series, shape, imageShape, out, filename, dtype, workers, executor)
 
-    # Reshape the volume into the image shape
-    volume = volume.reshape(shape)
+    if rescale:
+        # Apply the slope and intercept of each image in place, they are broadcast across the image dimensions
+        broadcastShape = series.shape + (1,) * len(imageShape)
+        if (slopes != 1.0).any():
+            np.multiply(volume, slopes.reshape(broadcastShape), out=volume, casting='unsafe')
+
+        if (intercepts != 0.0).any():
+            np.add(volume, intercepts.reshape(broadcastShape), out=volume, casting='unsafe')
+
+        if isinstance(volume, np.memmap):
+            volume.flush()
 
     # DICOM uses LPS space
     space = 'left-posterior-superior'
 
-    # Row cosines is first 3 elements, column cosines is last 3 elements of array, compute z cosines from row/col
-    rowCosines = np.array(imageOrientation[:3])
-    colCosines = np.array(imageOrientation[3:])
-    zCosines = np.cross(rowCosines, colCosines)
-
     # Orientation is combination of the three cosines direction matrix
     # Note: If the user sorts based on (z) location and sets reverse to True, then the third (z) column of orientation
     # will need to be inverted to accurately reflect the orientation. No metadata for if the series is reverse sorted
     # is not stored and I don't think it is worth storing. Rather, I have decided to leave it up to the user to change
     # that last dimension if necessary. Until there is an valid application where reverse is used then I won't bother
-    orientation = np.hstack((rowCosines[:, None], colCosines[:, None], zCosines[:, None]))
+    orientation = getOrientationMatrix(imageOrientation)
 
     # Return Volume class containing information about the volume
     # It's a basic wrapper class to contain any relevant data for the volume
     return Volume(volume, space, orientation, origin, spacing)
+
+
+def combineImages(series, shape, imageShape, out=None, filename=None, dtype=None, workers=None, executor=None):
+    """Decode each image in a sorted series into an N-D Numpy array
+
+    Each multi-frame dataset is decoded exactly once and its frames are copied into the volume from views of the decoded
+    array. The decoded array is released as soon as all of its frames have been copied. If the series consists of every
+    frame of one multi-frame dataset in order, the decoded array is reshaped and returned without copying.
+
+    If the :obj:`pixelCache` is enabled, images in the cache are taken from it rather than decoded and each decoded
+    image is added to it. Images that are written to a memory-mapped file by worker processes are not added.
+
+    Parameters
+    ----------
+    series : Series
+        Sorted series to decode the images from
+    shape : tuple(int)
+        Shape of the volume which is the series shape followed by the image shape
+    imageShape : tuple(int)
+        Shape of each image in the series
+    out : numpy.ndarray, optional
+        See :meth:`combineSeries` for more information on this parameter
+    filename : str, optional
+        See :meth:`combineSeries` for more information on this parameter
+    dtype : numpy.dtype, optional
+        Data type of the volume (default is None, which uses the data type of the decoded images). Ignored if
+        :obj:`out` is given.
+    workers : int, optional
+        See :meth:`combineSeries` for more information on this parameter
+    executor : :class:`concurrent.futures.Executor`, optional
+        See :meth:`combineSeries` for more information on this parameter
+
+    Raises
+    ------
+    Exception
+        If a decoded image does not have the image shape
+
+    Returns
+    -------
+    numpy.ndarray
+        Volume containing the decoded images
+    """
+
+    # Take any images that were decoded before from the pixel cache, only the remaining images are decoded
+    keys = [getPixelCacheKey(dataset) for dataset in series]
+    cachedImages = {}
+    for index, key in enumerate(keys):
+        image = pixelCache.get(key)
+        if image is not None:
+            cachedImages[index] = image
+
+    if executor is not None or (workers is not None and workers > 1):
+        # The frames of multi-frame datasets are split so that there is at least one task for each worker
+        tasks = getDecodeTasks(series, cachedImages, workers if executor is None else os.cpu_count())
+
+        # Decoding in parallel requires every dataset to be read from a file and is only worthwhile with multiple tasks
+        if tasks is not None and len(tasks) > 1:
+            # Workers write directly into a memory-mapped file, so its data type must be known before any image is
+            # decoded
+            if filename is not None and out is None and dtype is None:
+                dtype = getPixelDtype(series[0].parent if series.isMultiFrame else series[0])
+
+            if executor is not None:
+                return combineImagesParallel(tasks, shape, imageShape, out, filename, dtype, executor, cachedImages,
+                                             keys)
+
+            with ProcessPoolExecutor(workers) as executor:
+                return combineImagesParallel(tasks, shape, imageShape, out, filename, dtype, executor, cachedImages,
+                                             keys)
+
+        logger.debug('Unable to decode images in parallel, decoding serially instead')
+
+    if series.isMultiFrame:
+        # If the frames are exactly the frames of one dataset in their original order, then the decoded frames already
+        # are the volume
+        parent = series[0].parent
+        if out is None and filename is None and not pixelCache.isEnabled and \
+                len(series) == int(parent.get('NumberOfFrames', 1)) and \
+                all(dataset.parent is parent and dataset.sliceIndex == index for index, dataset in enumerate(series)):
+            frames = getFrames(parent)
+
+            if frames.shape[1:] == imageShape and (dtype is None or frames.dtype == dtype):
+                return frames.reshape(shape)
+
+        # Decoded frames for each parent and the number of frames from each parent that still need to be placed in the
+        # volume, the parent is keyed by its ID since datasets are not hashable
+        parentFrames = {}
+        remainingFrames = Counter(id(dataset.parent) for dataset in series)
+
+    # Decode each image directly into the volume, the volume is allocated when the first image is decoded since that is
+    # when the data type is known
+    volume = out
+    for index, dataset in enumerate(series):
+        image = cachedImages.get(index)
+
+        if series.isMultiFrame:
+            parentKey = id(dataset.parent)
+            if image is None:
+                if parentKey not in parentFrames:
+                    parentFrames[parentKey] = getFrames(dataset.parent)
+
+                image = parentFrames[parentKey][dataset.sliceIndex]
+                pixelCache.put(keys[index], image)
+
+            # Release the decoded parent once all of its frames are placed
+            remainingFrames[parentKey] -= 1
+            if remainingFrames[parentKey] == 0:
+                parentFrames.pop(parentKey, None)
+        elif image is None:
+            image = readPixelArray(dataset)
+            pixelCache.put(keys[index], image)
+
+        if image.shape != imageShape:
+            logger.debug('Dataset #%i shape: %s, expected shape: %s' % (index, image.shape, imageShape))
+            raise Exception('Datasets do not have the same shape. Unable to combine into one volume')
+
+        if volume is None:
+            if dtype is None:
+                dtype = image.dtype
+
+            if filename is None:
+                volume = np.empty(shape, dtype=dtype)
+            else:
+                volume = np.memmap(filename, dtype=dtype, mode='w+', shape=shape)
+
+        volume[np.unravel_index(index, series.shape)] = image
+
+    # Write any changes in the memory-mapped volume to disk
+    if isinstance(volume, np.memmap):
+        volume.flush()
+
+    return volume
+
+
+def getDecodeTasks(series, skipIndices=(), taskCount=None):
+    """Split the decoding of a series into tasks that can be done in separate processes
+
+    Each task is a list of (filename, sliceIndices, indices) tuples where filename is the DICOM file to decode,
+    sliceIndices are the frames to take from the file (None if the file is not multi-frame) and indices are the flat
+    indices of the images in the volume. The frames of a multi-frame file are in one task so the file is only decoded
+    once, unless there are fewer multi-frame files than :obj:`taskCount`. In that case, the frames of each file are
+    split into several tasks that each decode only their frames, see :meth:`readFrames`.
+
+    Parameters
+    ----------
+    series : Series
+        Sorted series to decode
+    skipIndices : container(int), optional
+        Indices of the datasets that do not need to be decoded, such as images that are in the pixel cache (default is
+        empty)
+    taskCount : int, optional
+        Minimum number of tasks to split the frames of multi-frame datasets into, such as the number of workers
+        (default is None, which never splits the frames of a dataset)
+
+    Returns
+    -------
+    list(list(tuple(str, list(int), list(int))))
+        List of tasks, None if any dataset was not read from a file
+    """
+
+    if series.isMultiFrame:
+        parents = OrderedDict()
+        for index, dataset in enumerate(series):
+            if index in skipIndices:
+                continue
+
+            filename = getattr(dataset.parent, 'filename', None)
+            if not isinstance(filename, str):
+                return None
+
+            parents.setdefault(id(dataset.parent), (filename, [], []))
+            parents[id(dataset.parent)][1].append(dataset.sliceIndex)
+            parents[id(dataset.parent)][2].append(index)
+
+        items = list(parents.values())
+
+        # With fewer datasets than tasks, such as a single enhanced MR or CT file, each dataset is split into several
+        # tasks so all of the workers are used
+        if items and taskCount is not None and len(items) < taskCount:
+            splitCount = -(-taskCount // len(items))
+
+            splitItems = []
+            for filename, sliceIndices, indices in items:
+                chunkSize = -(-len(sliceIndices) // splitCount)
+                splitItems.extend((filename, sliceIndices[i:i + chunkSize], indices[i:i + chunkSize])
+                                  for i in range(0, len(sliceIndices), chunkSize))
+
+            items = splitItems
+
+        return [[item] for item in items]
+    else:
+        items = []
+        for index, dataset in enumerate(series):
+            if index in skipIndices:
+                continue
+
+            filename = getattr(dataset, 'filename', None)
+            if not isinstance(filename, str):
+                return None
+
+            items.append((filename, None, [index]))
+
+        # Group the datasets so the overhead of sending each task is small compared to decoding
+        chunkSize = max(1, len(items) // 64)
+        return [items[i:i + chunkSize] for i in range(0, len(items), chunkSize)]
+
+
+def decodeTask(task, imageShape, filename=None, dtype=None, shape=None):
+    """Decode the images of a task from :meth:`getDecodeTasks`
+
+    This is run in a worker process, so it must be a module-level function. Each file is read again from disk, so any
+    changes made to its dataset in memory are not used. Only the frames of a multi-frame file that are in the task are
+    decoded.
+
+    Parameters
+    ----------
+    task : list(tuple(str, list(int), list(int)))
+        Task to decode
+    imageShape : tuple(int)
+        Shape of each image
+    filename : str, optional
+        Filename of a memory-mapped volume to write the images into (default is None, which returns the images instead)
+    dtype : numpy.dtype, optional
+        Data type of the memory-mapped volume, only used if :obj:`filename` is given
+    shape : tuple(int), optional
+        Shape of the memory-mapped volume, only used if :obj:`filename` is given
+
+    Raises
+    ------
+    Exception
+        If a decoded image does not have the image shape
+
+    Returns
+    -------
+    list(tuple(list(int), numpy.ndarray))
+        Flat indices in the volume and the decoded images for each file of the task, empty if the images were written
+        to the memory-mapped volume
+    """
+
+    results = []
+    volume = None if filename is None else np.memmap(filename, dtype=dtype, mode='r+', shape=shape)
+
+    for DCMFilename, sliceIndices, indices in task:
+        dataset = pydicom.dcmread(DCMFilename, force=True)
+
+        if sliceIndices is None:
+            images = readPixelArray(dataset)[None]
+        else:
+            images = readFrames(dataset, sliceIndices)
+
+        if images.shape[1:] != imageShape:
+            logger.debug('Dataset %s shape: %s, expected shape: %s' % (DCMFilename, images.shape[1:], imageShape))
+            raise Exception('Datasets do not have the same shape. Unable to combine into one volume')
+
+        if volume is None:
+            results.append((indices, images))
+        else:
+            volume.reshape((-1,) + imageShape)[indices] = images
+
+    if volume is not None:
+        volume.flush()
+
+    return results
+
+
+def combineImagesParallel(tasks, shape, imageShape, out, filename, dtype, executor, cachedImages=None, keys=None):
+    """Decode the images of a series into an N-D Numpy array using an executor
+
+    See :meth:`combineImages` for more information on the parameters. Every task is submitted to the executor at once.
+    When writing into a memory-mapped file, :obj:`dtype` must be given since the workers write into the file. Otherwise,
+    the volume is allocated once the first task is finished, using the data type of its images if :obj:`dtype` is None.
+
+    Images in :obj:`cachedImages`, a dictionary of images keyed by their flat index, are placed in the volume without
+    being decoded. Each image that is returned by a task is added to the pixel cache using the key in :obj:`keys` at
+    its flat index.
+
+    Returns
+    -------
+    numpy.ndarray
+        Volume containing the decoded images
+    """
+
+    volume = out
+    if volume is None and filename is not None:
+        volume = np.memmap(filename, dtype=dtype, mode='w+', shape=shape)
+        volume.flush()
+
+    # Workers write directly into the memory-mapped file, otherwise the decoded images are returned
+    results = executor.map(decodeTask, tasks, itertools.repeat(imageShape), itertools.repeat(filename),
+                           itertools.repeat(dtype), itertools.repeat(shape))
+
+    # Place the images of each task as soon as it is finished rather than waiting for every task
+    seriesShape = shape[:len(shape) - len(imageShape)]
+    for indices, images in itertools.chain.from_iterable(results):
+        if volume is None:
+            volume = np.empty(shape, dtype=images.dtype if dtype is None else dtype)
+
+        for index, image in zip(indices, images):
+            volume[np.unravel_index(index, seriesShape)] = image
+
+            if keys is not None:
+                pixelCache.put(keys[index], image)
+
+    if cachedImages:
+        for index, image in cachedImages.items():
+            volume[np.unravel_index(index, seriesShape)] = image
+
+    # Write any changes in the memory-mapped volume to disk
+    if isinstance(volume, np.memmap):
+        volume.flush()
+
+    return volume
@@ -0,0 +1,74 @@
+class DeferredDataset():
+    """Dataset for a DICOM file that is not read until it is first accessed
+
+    The deferred dataset is a lightweight proxy used when the hierarchy is built without reading the DICOM files, such
+    as from the directory records of a DICOMDIR file. The file is read the first time a data element is accessed or
+    :meth:`load` is called and the dataset is kept afterwards.
+
+    Accessing any data element or calling any method of :class:`pydicom.Dataset` on the deferred dataset is forwarded
+    to the dataset that was read, so it can be used in the same manner as the dataset itself. A :class:`Series` replaces
+    its deferred datasets with the datasets that were read before it is sorted or combined, see
+    :meth:`Series.loadDeferred`.
+
+    Parameters
+    ----------
+    filename : str
+        Filename of the DICOM file
+    readFunc : callable
+        Function that takes a filename and returns the dataset
+    """
+
+    __slots__ = ('filename', 'readFunc', '_dataset')
+
+    def __init__(self, filename, readFunc):
+        self.filename = filename
+        self.readFunc = readFunc
+        self._dataset = None
+
+    @property
+    def isLoaded(self):
+        """Whether the DICOM file has been read"""
+
+        return self._dataset is not None
+
+    def load(self):
+        """Read the DICOM file if it has not been read yet
+
+        Returns
+        -------
+        pydicom.Dataset
+            Dataset that was read
+        """
+
+        if self._dataset is None:
+            self._dataset = self.readFunc(self.filename)
+
+        return self._dataset
+
+    def get(self, key, default=None):
+        return self.load().get(key, default)
+
+    def __getattr__(self, name):
+        # Slots that are not set yet (e.g. while unpickling) and special methods are not forwarded to the dataset
+        if name.startswith('__') or name in DeferredDataset.__slots__:
+            raise AttributeError(name)
+
+        return getattr(self.load(), name)
+
+    def __contains__(self, key):
+        return key in self.load()
+
+    def __getitem__(self, key):
+        return self.load()[key]
+
+    def __iter__(self):
+        return iter(self.load())
+
+    def __len__(self):
+        return len(self.load())
+
+    def __str__(self):
+        return str(self._dataset) if self.isLoaded else 'Deferred dataset %s' % self.filename
+
+    def __repr__(self):
+        return self.__str__()
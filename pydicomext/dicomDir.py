@@ -4,6 +4,8 @@ from pydicomext.patient import Patient
 
 
 class DicomDir(dict):
+    __slots__ = ()
+
     def add(self, var):
         if isinstance(var, Patient):
             self[var.ID] = var
@@ -0,0 +1,166 @@
+import functools
+import os
+import pickle
+import sqlite3
+
+import pydicom
+
+from pydicomext.headerDataset import readHeader
+from pydicomext.readDatasets import readDatasets
+
+# Version of the index format, bump this whenever the table layout or stored header format changes
+INDEX_VERSION = 2
+
+
+class DirectoryIndex():
+    """Persistent on-disk index of DICOM headers used to speed up repeated loading of a directory
+
+    The index is a SQLite database that records the path, modification time and size of each file. For each DICOM file,
+    the patient ID, study instance UID and series instance UID are stored in indexed columns along with a compact record
+    of its header, see :class:`HeaderDataset`. Files that are not DICOM files are recorded as well so that they are not
+    read again.
+
+    When a directory is loaded again, only the files that were added or modified since the last load are read. The
+    hierarchy is built from the records of the unchanged files, so organizing, sorting and combining the series does not
+    read their headers again, and the pixel data of each file is only read when it is decoded. When filtering for a
+    patient, study or series, only the matching records are retrieved using the ID columns. Files that no longer exist
+    are dropped from the index.
+
+    Records are stored using :mod:`pickle`, so only open index files that you trust. The index is recreated if it was
+    created by a different version of the index format or of pydicom.
+
+    Parameters
+    ----------
+    filename : str
+        Filename of the index database, created if it does not exist
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.connection = sqlite3.connect(filename)
+
+        self.connection.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+
+        # Recreate the index if it was created by a different version, the table layout or records may not be compatible
+        version = '%i/%s' % (INDEX_VERSION, pydicom.__version__)
+        row = self.connection.execute('SELECT value FROM meta WHERE key = ?', ('version',)).fetchone()
+
+        if row is None or row[0] != version:
+            self.connection.execute('DROP TABLE IF EXISTS files')
+            self.connection.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)', ('version', version))
+
+        # The header is NULL for files that are not DICOM files, implicitVR records whether these were checked for
+        # DICOM files without the preamble
+        self.connection.execute('CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, mtime INTEGER, size INTEGER, '
+                                'implicitVR INTEGER, patientID TEXT, studyID TEXT, seriesID TEXT, header BLOB)')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS filesIDs ON files (patientID, studyID, seriesID)')
+        self.connection.commit()
+
+    def load(self, filenames, patientID=None, studyID=None, seriesID=None, workers=None, executor=None,
+             implicitVR=False):
+        """Organize files into patients, studies and series, using the index for any files that have not changed
+
+        The index is updated with any new or modified files and any files in the index that are not in
+        :obj:`filenames` are removed from the index. All new or modified files are read and indexed regardless of the
+        patient ID, study ID or series ID given.
+
+        Each dataset is a :class:`HeaderDataset`, either the one that was just read or one decoded from the record in
+        the index, so no unchanged file is read again to organize, sort or combine the series. The pixel data is read
+        from the file once it is decoded.
+
+        Parameters
+        ----------
+        filenames : list(str)
+            List of filenames to load, files that are not DICOM files are skipped
+        patientID : str, optional
+            See :meth:`loadDirectory` for more information on this parameter
+        studyID : str, optional
+            See :meth:`loadDirectory` for more information on this parameter
+        seriesID : str, optional
+            See :meth:`loadDirectory` for more information on this parameter
+        workers : int, optional
+            See :meth:`loadDirectory` for more information on this parameter
+        executor : :class:`concurrent.futures.Executor`, optional
+            See :meth:`loadDirectory` for more information on this parameter
+        implicitVR : bool, optional
+            See :meth:`loadDirectory` for more information on this parameter
+
+        Returns
+        -------
+        DicomDir or Patient or Study or Series
+            See :meth:`loadDirectory` for more information on the return value
+        """
+
+        # Retrieve the file information for all files in the index, the records are only retrieved when needed
+        indexed = {row[0]: row[1:] for row in self.connection.execute(
+            'SELECT path, mtime, size, implicitVR, header IS NOT NULL FROM files')}
+
+        # Find any files that are new or have been modified since they were indexed. Files that are not DICOM files
+        # are checked again if DICOM files without the preamble are now detected
+        stats = {}
+        staleFilenames = []
+        for filename in filenames:
+            stat = os.stat(filename)
+            stats[filename] = (stat.st_mtime_ns, stat.st_size)
+
+            row = indexed.get(filename)
+            if row is None or row[:2] != stats[filename] or (implicitVR and not row[2] and not row[3]):
+                staleFilenames.append(filename)
+
+        # Read the headers of the new or modified files and update the index with their records
+        headers = {}
+        readFunc = functools.partial(readHeader, implicitVR=implicitVR)
+
+        for filename, header in zip(staleFilenames, readDatasets(staleFilenames, workers, executor, readFunc)):
+            if header is None:
+                IDs = (None, None, None)
+                record = None
+            else:
+                IDs = (header.get('PatientID'), header.get('StudyInstanceUID'), header.get('SeriesInstanceUID'))
+                record = pickle.dumps(header, pickle.HIGHEST_PROTOCOL)
+                headers[filename] = header
+
+            self.connection.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                                    (filename,) + stats[filename] + (implicitVR,) + IDs + (record,))
+
+        # Remove any files from the index that no longer exist
+        self.connection.executemany('DELETE FROM files WHERE path = ?',
+                                    [(filename,) for filename in indexed if filename not in stats])
+        self.connection.commit()
+
+        # Decode the records of the unchanged files in a single query, only the records that match the patient, study
+        # or series being filtered for are retrieved
+        conditions = ['header IS NOT NULL']
+        parameters = []
+        for column, ID in [('patientID', patientID), ('studyID', studyID), ('seriesID', seriesID)]:
+            if ID:
+                conditions.append('%s = ?' % column)
+                parameters.append(ID)
+
+        for filename, record in self.connection.execute('SELECT path, header FROM files WHERE %s' %
+                                                        ' AND '.join(conditions), parameters):
+            if filename not in headers:
+                headers[filename] = pickle.loads(record)
+
+        # The hierarchy is built in the order of the filenames, which skips any datasets that do not match the filter
+        return buildHierarchy((headers.get(filename) for filename in filenames), patientID, studyID, seriesID)
+
+    def close(self):
+        """Close the index database"""
+
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __str__(self):
+        return 'DirectoryIndex %s' % self.filename
+
+    def __repr__(self):
+        return self.__str__()
+
+
+from .loadDirectory import buildHierarchy
@@ -0,0 +1,88 @@
+class FrameDataset():
+    """Dataset for a single frame of a multi-frame dataset
+
+    The frame dataset is a lightweight proxy to the item of the Per-frame Functional Groups Sequence of the parent
+    dataset for this frame. The item is not retrieved until the frame dataset is first accessed, so the sequence, which
+    can be very large, is not parsed until the values for a frame are needed, such as when sorting a series.
+
+    Accessing any data element or calling any method of :class:`pydicom.Dataset` on the frame dataset is forwarded to
+    the item, so it can be used in the same manner as the item itself. Any data element that is not in the item is
+    retrieved from the Shared Functional Groups Sequence of the parent instead, so functional groups are available
+    regardless of whether they are per-frame or shared.
+
+    Parameters
+    ----------
+    parent : pydicom.Dataset
+        Multi-frame dataset that contains the frame
+    sliceIndex : int
+        Index of the frame within the parent dataset
+    """
+
+    __slots__ = ('parent', 'sliceIndex', '_item')
+
+    def __init__(self, parent, sliceIndex):
+        self.parent = parent
+        self.sliceIndex = sliceIndex
+        self._item = None
+
+    @property
+    def item(self):
+        """Item of the Per-frame Functional Groups Sequence for this frame"""
+
+        if self._item is None:
+            self._item = self.parent.PerFrameFunctionalGroupsSequence[self.sliceIndex]
+
+        return self._item
+
+    @property
+    def sharedItem(self):
+        """Item of the Shared Functional Groups Sequence of the parent, None if the parent has no shared groups"""
+
+        sequence = self.parent.get('SharedFunctionalGroupsSequence')
+
+        return sequence[0] if sequence else None
+
+    def get(self, key, default=None):
+        value = self.item.get(key)
+
+        if value is None and self.sharedItem is not None:
+            value = self.sharedItem.get(key)
+
+        return default if value is None else value
+
+    def __getattr__(self, name):
+        # Slots that are not set yet (e.g. while unpickling) and special methods are not forwarded to the item
+        if name.startswith('__') or name in FrameDataset.__slots__:
+            raise AttributeError(name)
+
+        try:
+            return getattr(self.item, name)
+        except AttributeError:
+            if self.sharedItem is None:
+                raise
+
+            return getattr(self.sharedItem, name)
+
+    def __contains__(self, key):
+        return key in self.item or (self.sharedItem is not None and key in self.sharedItem)
+
+    def __getitem__(self, key):
+        try:
+            return self.item[key]
+        except KeyError:
+            if self.sharedItem is None:
+                raise
+
+            return self.sharedItem[key]
+
+    def __iter__(self):
+        return iter(self.item)
+
+    def __len__(self):
+        return len(self.item)
+
+    def __str__(self):
+        return 'Frame %i of %s' % (self.sliceIndex, self.parent.get('SOPInstanceUID'))
+
+    def __repr__(self):
+        return self.__str__()
@@ -0,0 +1,176 @@
+import numpy as np
+
+
+def getSliceNormals(imageOrientations):
+    """Calculates the slice normal of each image orientation
+
+    The slice normal is the cross product of the row and column cosines, i.e. the direction of the Z axis.
+
+    Parameters
+    ----------
+    imageOrientations : list(list(float)) or numpy.ndarray
+        Single image orientation or list of N image orientations, the first three elements of each orientation are the
+        row cosines and the last three elements are the column cosines
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of shape (3,) for a single orientation or (N, 3) containing the slice normal of each orientation
+    """
+
+    imageOrientations = np.asarray(imageOrientations, dtype=float)
+
+    return np.cross(imageOrientations[..., :3], imageOrientations[..., 3:])
+
+
+def getOrientationMatrix(imageOrientation):
+    """Creates the direction matrix for an image orientation
+
+    The columns of the matrix are the row (x) cosines, column (y) cosines and slice normal (z).
+
+    Parameters
+    ----------
+    imageOrientation : list(float) or numpy.ndarray
+        Image orientation where the first three elements are the row cosines and the last three elements are the column
+        cosines
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of shape (3, 3) containing the direction cosines as columns
+    """
+
+    imageOrientation = np.asarray(imageOrientation, dtype=float)
+
+    return np.column_stack((imageOrientation[:3], imageOrientation[3:], getSliceNormals(imageOrientation)))
+
+
+def getZPositions(imageOrientation, imagePositions):
+    """Calculates slice locations from an image orientation and a list of image positions
+
+    The slice location is the projection of each image position onto the slice normal, which is done for all positions
+    at once with a single matrix product.
+
+    Parameters
+    ----------
+    imageOrientation : list(float)
+        Image orientation that is shared by all of the positions, the first three elements are the row cosines and the
+        last three elements are the column cosines
+    imagePositions : list(list(float)) or numpy.ndarray
+        List of N image positions or an array of shape (N, 3)
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of length N containing the Z position of each image position
+    """
+
+    return np.asarray(imagePositions, dtype=float).reshape(-1, 3) @ getSliceNormals(imageOrientation)
+
+
+def isOrientationUniform(imageOrientations, rtol=0.0, atol=0.0):
+    """Checks whether all image orientations are the same as the first one
+
+    By default the orientations must be exactly equal, a tolerance can be given to allow for rounding differences.
+
+    Parameters
+    ----------
+    imageOrientations : list(list(float)) or numpy.ndarray
+        List of N image orientations or an array of shape (N, 6)
+    rtol : float, optional
+        Relative tolerance, see :func:`numpy.isclose` (default is 0)
+    atol : float, optional
+        Absolute tolerance, see :func:`numpy.isclose` (default is 0)
+
+    Returns
+    -------
+    bool
+        True if there is at least one orientation and all orientations are the same, False otherwise. False is also
+        returned if any orientation contains NaN
+    """
+
+    imageOrientations = np.asarray(imageOrientations, dtype=float).reshape(-1, 6)
+
+    return len(imageOrientations) > 0 and \
+        bool(np.isclose(imageOrientations, imageOrientations[0], rtol=rtol, atol=atol).all())
+
+
+def getGantryTilt(imageOrientation, imagePositions, stackIDs=None):
+    """Calculates the gantry tilt of a stack of images in degrees
+
+    The gantry tilt is the angle between the slice normal and the direction from one image position to the next. If the
+    slices are stacked perpendicular to the image plane, the tilt is zero. Images that share the same position, such as
+    the time points of a spatiotemporal series, are ignored.
+
+    If the images belong to more than one stack, only consecutive image positions within the same stack are compared
+    since separate stacks may be offset from each other in any direction.
+
+    Parameters
+    ----------
+    imageOrientation : list(float)
+        Image orientation that is shared by all of the positions
+    imagePositions : list(list(float)) or numpy.ndarray
+        List of N image positions or an array of shape (N, 3), ordered by slice
+    stackIDs : list(float) or numpy.ndarray, optional
+        Stack ID of each image position (default is None, which treats all images as one stack). Images with a NaN
+        stack ID are treated as one stack.
+
+    Returns
+    -------
+    float
+        Largest angle in degrees between the slice normal and the offset between consecutive image positions, 0 if
+        there are less than two distinct positions
+    """
+
+    imagePositions = np.asarray(imagePositions, dtype=float).reshape(-1, 3)
+    normal = getSliceNormals(imageOrientation)
+
+    if stackIDs is None:
+        offsets = np.diff(imagePositions, axis=0)
+    else:
+        stackIDs = np.asarray(stackIDs, dtype=float)
+        stackIDs = np.where(np.isnan(stackIDs), -1.0, stackIDs)
+        offsets = np.concatenate([np.diff(imagePositions[stackIDs == stackID], axis=0)
+                                  for stackID in np.unique(stackIDs)])
+
+    lengths = np.linalg.norm(offsets, axis=1)
+    nonZero = lengths > 0
+
+    if not nonZero.any():
+        return 0.0
+
+    # Direction of the offset does not matter, so the absolute value of the cosine is used
+    cosines = np.abs(offsets[nonZero] @ normal) / (lengths[nonZero] * np.linalg.norm(normal))
+
+    return float(np.degrees(np.arccos(np.clip(cosines, 0.0, 1.0))).max())
+
+
+def getSliceGaps(zPositions, tolerance=0.1):
+    """Finds gaps between slices, such as from missing slices, in a list of slice locations
+
+    The distinct slice locations are sorted and the spacing between consecutive locations is compared with the median
+    spacing. Any spacing that is larger than the median by more than the relative tolerance is considered a gap.
+
+    Parameters
+    ----------
+    zPositions : list(float) or numpy.ndarray
+        Slice location of each image, duplicate locations are allowed
+    tolerance : float, optional
+        Relative tolerance of the spacing between slices (default is 0.1)
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of the slice locations that are followed by a gap, empty if there are no gaps or less than three distinct
+        slice locations
+    """
+
+    # Round the locations so that small differences from floating point error are not treated as separate slices
+    zPositions = np.unique(np.round(np.asarray(zPositions, dtype=float), 6))
+
+    if len(zPositions) < 3:
+        return np.array([])
+
+    spacings = np.diff(zPositions)
+
+    return zPositions[:-1][spacings > np.median(spacings) * (1.0 + tolerance)]
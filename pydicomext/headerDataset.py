@@ -0,0 +1,246 @@
+import os
+import struct
+
+import pydicom
+from pydicom.datadict import tag_for_keyword
+from pydicom.dataset import FileDataset
+from pydicom.tag import Tag
+
+from pydicomext.pixelData import readPixelArray
+from pydicomext.util import isDICOMDIRDataset, openDICOMFile
+
+# Tag of the pixel data element
+PIXEL_DATA_TAG = 0x7FE00010
+
+# Explicit VRs that have a 2-byte reserved field followed by a 4-byte length
+EXTENDED_LENGTH_VRS = [b'OB', b'OD', b'OF', b'OL', b'OW', b'SQ', b'UC', b'UN', b'UR', b'UT']
+
+# Keywords of the data elements kept in a header dataset, these are the elements used to build the patient, study and
+# series hierarchy, to create the metadata table and to decode the pixel data
+HEADER_KEYWORDS = [
+    # Patient, study, series and instance
+    'SpecificCharacterSet', 'SOPClassUID', 'SOPInstanceUID', 'Modality',
+    'PatientName', 'PatientID', 'IssuerOfPatientID', 'PatientBirthDate', 'PatientBirthTime', 'PatientSex',
+    'OtherPatientIDs', 'OtherPatientNames', 'PatientAge', 'PatientSize', 'PatientWeight', 'EthnicGroup',
+    'PatientComments', 'PatientIdentityRemoved', 'PatientPosition',
+    'StudyInstanceUID', 'StudyDate', 'StudyTime', 'StudyDescription',
+    'SeriesInstanceUID', 'SeriesDate', 'SeriesTime', 'SeriesDescription', 'SeriesNumber',
+
+    # Metadata table, see SeriesMetadata
+    'ImagePositionPatient', 'ImageOrientationPatient', 'PixelSpacing', 'SliceThickness', 'SpacingBetweenSlices',
+    'SliceLocation', 'TriggerTime', 'AcquisitionDateTime', 'InstanceNumber', 'RescaleSlope', 'RescaleIntercept',
+    'SharedFunctionalGroupsSequence', 'PerFrameFunctionalGroupsSequence',
+
+    # Pixel data description
+    'Rows', 'Columns', 'SamplesPerPixel', 'BitsAllocated', 'BitsStored', 'HighBit', 'PixelRepresentation',
+    'PhotometricInterpretation', 'PlanarConfiguration', 'NumberOfFrames',
+]
+
+# Tags of the header keywords along with the pixel data, which is never read from the full header
+HEADER_TAGS = frozenset([Tag(tag_for_keyword(keyword)) for keyword in HEADER_KEYWORDS] + [Tag(PIXEL_DATA_TAG)])
+
+
+class HeaderDataset(FileDataset):
+    """Dataset containing a compact record of the header of a DICOM file along with the location of its pixel data
+
+    Only the data elements in :obj:`HEADER_KEYWORDS` are kept, which are the elements needed to build the hierarchy,
+    sort and combine the series and decode the pixel data. Any other data element is read from the file when it is
+    accessed, see :meth:`readFullHeader`. The full header is not kept, so each access reads the file again. Call
+    :meth:`readFullHeader` once instead when many other data elements are needed.
+
+    The pixel data is not stored in the dataset at all, not even as a deferred element. Instead, the byte offset and
+    length of the pixel data within the file are stored so that the pixel data can be read with a single read when it
+    is needed. This keeps the memory usage of each dataset small and independent of the image size and the size of the
+    header, which allows holding the headers of an entire archive in memory.
+
+    The raw pixel data is retrieved using :meth:`readPixelData`. Unlike a regular dataset, :attr:`pixel_array` reads and
+    decodes the pixel data each time it is accessed rather than storing it in the dataset.
+
+    Use :meth:`readHeader` to read a header dataset from a file.
+
+    Parameters
+    ----------
+    filename : str
+        Filename of the DICOM file
+    dataset : pydicom.FileDataset
+        Dataset that was read from the file containing the header keywords, stopping before the pixel data
+    pixelDataOffset : int
+        Byte offset of the pixel data value within the file, None if the file has no pixel data
+    pixelDataLength : int
+        Length of the pixel data value in bytes. For encapsulated pixel data, this is the number of bytes remaining in
+        the file
+    pixelDataVR : str
+        Value representation of the pixel data
+    """
+
+    def __init__(self, filename, dataset, pixelDataOffset=None, pixelDataLength=None, pixelDataVR=None):
+        FileDataset.__init__(self, filename, dataset, None, dataset.file_meta, dataset.is_implicit_VR,
+                             dataset.is_little_endian)
+
+        self.pixelDataOffset = pixelDataOffset
+        self.pixelDataLength = pixelDataLength
+        self.pixelDataVR = pixelDataVR
+
+    @property
+    def hasPixelData(self):
+        """Whether the DICOM file contains pixel data"""
+
+        return self.pixelDataOffset is not None
+
+    def readPixelData(self):
+        """Read the raw pixel data from the DICOM file
+
+        Raises
+        ------
+        Exception
+            If the DICOM file has no pixel data
+
+        Returns
+        -------
+        bytes
+            Raw pixel data, which is encapsulated for compressed transfer syntaxes
+        """
+
+        if not self.hasPixelData:
+            raise Exception('Dataset has no pixel data: %s' % self.filename)
+
+        with open(self.filename, 'rb') as file:
+            file.seek(self.pixelDataOffset)
+            pixelData = file.read(self.pixelDataLength)
+
+        if len(pixelData) != self.pixelDataLength:
+            raise Exception('Unable to read pixel data, the file may have been modified: %s' % self.filename)
+
+        return pixelData
+
+    def readFullHeader(self):
+        """Read the entire header of the DICOM file, the header is not kept in the dataset
+
+        Returns
+        -------
+        pydicom.FileDataset
+            Dataset containing every data element of the file except the pixel data
+        """
+
+        return pydicom.dcmread(self.filename, defer_size=2048, stop_before_pixels=True, force=True)
+
+    def __getattr__(self, name):
+        try:
+            return FileDataset.__getattr__(self, name)
+        except AttributeError:
+            # Data elements that are not kept are read from the file, the header keywords are missing from the file
+            tag = tag_for_keyword(name)
+            if tag is None or Tag(tag) in HEADER_TAGS:
+                raise
+
+            return getattr(self.readFullHeader(), name)
+
+    def __contains__(self, name):
+        if FileDataset.__contains__(self, name):
+            return True
+
+        try:
+            tag = Tag(name)
+        except (ValueError, OverflowError):
+            return False
+
+        return tag not in HEADER_TAGS and tag in self.readFullHeader()
+
+    def __getitem__(self, key):
+        try:
+            return FileDataset.__getitem__(self, key)
+        except KeyError:
+            if Tag(key) in HEADER_TAGS:
+                raise
+
+            return self.readFullHeader()[key]
+
+    @property
+    def pixel_array(self):
+        """Decoded pixel data, which is read from the file and decoded each time it is accessed"""
+
+        return readPixelArray(self)
+
+
+def readHeader(filename, implicitVR=False):
+    """Read the header of a DICOM file and locate its pixel data without reading it
+
+    Only the data elements in :obj:`HEADER_KEYWORDS` are kept, see :class:`HeaderDataset`. The file is checked to be a
+    DICOM file in the same manner as :meth:`readDataset`.
+
+    Parameters
+    ----------
+    filename : str
+        Filename of the DICOM file to read
+    implicitVR : bool, optional
+        See :meth:`isDICOMHeader` for more information on this parameter
+
+    Returns
+    -------
+    HeaderDataset or None
+        Dataset containing the header and location of the pixel data, None if the file is not a DICOM file or is a
+        DICOMDIR file
+    """
+
+    file = openDICOMFile(filename, implicitVR)
+    if file is None:
+        return None
+
+    with file:
+        dataset = pydicom.dcmread(file, stop_before_pixels=True, specific_tags=HEADER_KEYWORDS, force=True)
+
+        if isDICOMDIRDataset(dataset):
+            return None
+
+        # Reading stops with the file positioned at the start of the pixel data element
+        pixelDataLocation = readPixelDataLocation(file, dataset.is_implicit_VR, dataset.is_little_endian)
+
+    return HeaderDataset(filename, dataset, *pixelDataLocation)
+
+
+def readPixelDataLocation(file, isImplicitVR, isLittleEndian):
+    """Read the header of the pixel data element at the current position of a file
+
+    Parameters
+    ----------
+    file : file-like
+        File positioned at the start of the pixel data element
+    isImplicitVR : bool
+    isLittleEndian : bool
+
+    Returns
+    -------
+    tuple(int, int, str)
+        Offset of the value, length of the value and VR of the pixel data element. All of these are None if the file
+        is not positioned at a pixel data element
+    """
+
+    endian = '<' if isLittleEndian else '>'
+    start = file.tell()
+    header = file.read(12)
+
+    if len(header) < 8:
+        return None, None, None
+
+    group, element = struct.unpack(endian + 'HH', header[:4])
+    if (group << 16 | element) != PIXEL_DATA_TAG:
+        return None, None, None
+
+    if isImplicitVR:
+        VR = 'OW'
+        length, = struct.unpack(endian + 'I', header[4:8])
+        offset = start + 8
+    elif header[4:6] in EXTENDED_LENGTH_VRS:
+        VR = header[4:6].decode('ascii')
+        length, = struct.unpack(endian + 'I', header[8:12])
+        offset = start + 12
+    else:
+        VR = header[4:6].decode('ascii')
+        length, = struct.unpack(endian + 'H', header[6:8])
+        offset = start + 8
+
+    # Encapsulated pixel data has an undefined length, it ends with a sequence delimiter so read the rest of the file
+    if length == 0xFFFFFFFF:
+        length = os.fstat(file.fileno()).st_size - offset
+
+    return offset, length, VR
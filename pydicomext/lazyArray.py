@@ -0,0 +1,227 @@
+from collections import OrderedDict
+import itertools
+
+import numpy as np
+
+from pydicomext.pixelCache import getPixelCacheKey, pixelCache
+from pydicomext.pixelData import readPixelArray, getFrames
+
+
+class LazyArray():
+    """Array-like volume that decodes the images of a sorted series only when they are accessed
+
+    The array has the shape of the series followed by the image shape, in the same manner as the volume returned by
+    :meth:`combineSeries`. Indexing the array with NumPy indexing (integers, slices, integer or boolean arrays and
+    ellipsis) only decodes the images that are touched by the index. Recently decoded images are kept in a
+    least-recently-used cache. Images that are not in this cache are taken from the :obj:`pixelCache` if it is enabled
+    before being decoded.
+
+    Any operation that is not supported directly, such as arithmetic, can be done by converting the array to a NumPy
+    array using :func:`numpy.asarray`, which will decode every image.
+
+    Parameters
+    ----------
+    series : Series
+        Sorted series to decode the images from
+    imageShape : tuple(int)
+        Shape of each image in the series
+    cacheSize : int, optional
+        Maximum number of decoded images to keep in the cache (default is 16). Set to 0 to disable the cache.
+    """
+
+    def __init__(self, series, imageShape, cacheSize=16):
+        self.series = series
+        self.imageShape = tuple(imageShape)
+        self.cacheSize = cacheSize
+
+        self._cache = OrderedDict()
+        self._dtype = None
+
+    @property
+    def shape(self):
+        """Shape of the array which is the series shape followed by the image shape"""
+
+        return tuple(self.series.shape) + self.imageShape
+
+    @property
+    def ndim(self):
+        """Number of dimensions of the array"""
+
+        return len(self.shape)
+
+    @property
+    def size(self):
+        """Number of elements in the array"""
+
+        return int(np.prod(self.shape))
+
+    @property
+    def dtype(self):
+        """Data type of the array
+
+        This is the data type of the decoded images, so the first image is decoded if no images have been decoded yet.
+        """
+
+        if self._dtype is None:
+            self._getImages([0])
+
+        return self._dtype
+
+    @property
+    def nbytes(self):
+        """Number of bytes the array would take if all images were decoded"""
+
+        return self.size * self.dtype.itemsize
+
+    def clearCache(self):
+        """Remove all decoded images from the cache"""
+
+        self._cache.clear()
+
+    def _getImages(self, indices):
+        """Retrieve the decoded images for the given dataset indices, using the cache when possible
+
+        Images from the same multi-frame dataset are decoded together so that the dataset is only decoded once.
+
+        Parameters
+        ----------
+        indices : iterable(int)
+            Indices of the datasets in the series to decode
+
+        Returns
+        -------
+        dict(int, numpy.ndarray)
+            Dictionary of decoded images for each index
+        """
+
+        images = {}
+        missingIndices = []
+        decodedIndices = []
+
+        for index in indices:
+            if index in self._cache:
+                self._cache.move_to_end(index)
+                images[index] = self._cache[index]
+                continue
+
+            missingIndices.append(index)
+
+            image = pixelCache.get(getPixelCacheKey(self.series[index]))
+            if image is None:
+                decodedIndices.append(index)
+            else:
+                images[index] = image
+
+        if self.series.isMultiFrame:
+            # Group the missing frames by their parent so each parent is decoded once
+            parents = OrderedDict()
+            for index in decodedIndices:
+                parents.setdefault(id(self.series[index].parent), []).append(index)
+
+            for parentIndices in parents.values():
+                frames = getFrames(self.series[parentIndices[0]].parent)
+
+                # Copy the frames so the cache does not keep the entire parent array alive
+                for index in parentIndices:
+                    images[index] = frames[self.series[index].sliceIndex].copy()
+        else:
+            for index in decodedIndices:
+                images[index] = readPixelArray(self.series[index])
+
+        for index in decodedIndices:
+            pixelCache.put(getPixelCacheKey(self.series[index]), images[index])
+
+        for index in missingIndices:
+            if images[index].shape != self.imageShape:
+                raise Exception('Dataset #%i has shape %s but the volume has an image shape of %s' %
+                                (index, images[index].shape, self.imageShape))
+
+            if self._dtype is None:
+                self._dtype = images[index].dtype
+
+            if self.cacheSize > 0:
+                self._cache[index] = images[index]
+
+        # Remove the least recently used images until the cache is within its size
+        while len(self._cache) > self.cacheSize:
+            self._cache.popitem(last=False)
+
+        return images
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+
+        # Expand the ellipsis and pad the key with full slices so each dimension has an index
+        # None (new axis) does not consume a dimension
+        consumed = sum(1 for k in key if k is not None and k is not Ellipsis)
+        if any(k is Ellipsis for k in key):
+            ellipsisIndex = next(i for i, k in enumerate(key) if k is Ellipsis)
+            key = key[:ellipsisIndex] + (slice(None),) * (self.ndim - consumed) + key[ellipsisIndex + 1:]
+        else:
+            key = key + (slice(None),) * (self.ndim - consumed)
+
+        seriesShape = tuple(self.series.shape)
+
+        # For each dimension of the series, find the coordinates that are touched by the key and change the key to index
+        # into a sub-volume that only contains those coordinates. The kind of each index (integer, slice or array) is
+        # kept the same so that the result follows the same NumPy indexing rules as indexing the entire volume.
+        coordinates = []
+        subKey = []
+        axis = 0
+        for k in key:
+            if k is None or axis >= len(seriesShape):
+                subKey.append(k)
+                axis += k is not None
+                continue
+
+            size = seriesShape[axis]
+            if isinstance(k, slice):
+                values = np.arange(size)[k]
+                coordinates.append(np.sort(values))
+                subKey.append(slice(None) if k.step is None or k.step > 0 else slice(None, None, -1))
+            elif isinstance(k, (int, np.integer)):
+                coordinates.append(np.array([np.arange(size)[k]]))
+                subKey.append(0)
+            else:
+                k = np.asarray(k)
+
+                # Multi-dimensional boolean indices span multiple dimensions, so just decode the entire volume
+                if k.dtype == bool and k.ndim != 1:
+                    return np.asarray(self)[key]
+
+                values = np.arange(size)[k]
+                coordinates.append(np.unique(values))
+                subKey.append(np.searchsorted(coordinates[-1], values))
+
+            axis += 1
+
+        # Decode the images that are touched and place them in the sub-volume
+        subShape = tuple(len(x) for x in coordinates)
+        subCoordinates = list(itertools.product(*coordinates))
+        indices = [int(np.ravel_multi_index(x, seriesShape)) for x in subCoordinates]
+        images = self._getImages(indices)
+
+        subVolume = np.empty(subShape + self.imageShape, dtype=self.dtype)
+        for subIndex, index in zip(itertools.product(*[range(x) for x in subShape]), indices):
+            subVolume[subIndex] = images[index]
+
+        return subVolume[tuple(subKey)]
+
+    def __array__(self, dtype=None):
+        volume = self[...]
+
+        return volume if dtype is None else volume.astype(dtype, copy=False)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __str__(self):
+        return 'LazyArray(shape=%s, cached=%i)' % (self.shape, len(self._cache))
+
+    def __repr__(self):
+        return self.__str__()
@@ -0,0 +1,187 @@
+import os
+
+import pydicom
+from pydicom.errors import InvalidDicomError
+
+from pydicomext.deferredDataset import DeferredDataset
+from pydicomext.dicomDir import DicomDir
+from pydicomext.patient import Patient
+from pydicomext.readDatasets import readDataset
+from pydicomext.series import Series
+from pydicomext.study import Study
+from pydicomext.util import isDICOMDIRDataset
+
+
+def loadDICOMDIR(filename, patientID=None, studyID=None, seriesID=None, headerOnly=False):
+    """Load the DICOM files referenced by a DICOMDIR file and organize them into patients, studies and series
+
+    A DICOMDIR file is the index of the DICOM files on removable media such as a CD or USB drive. It contains a
+    directory record for each patient, study, series and image along with the path of each image file. The hierarchy is
+    built from these records alone, so only the DICOMDIR file itself is read regardless of the number of images.
+
+    Each series contains a :class:`DeferredDataset` for each of its files, which is read when first accessed. All files
+    of a series are read when the series is sorted or combined, see :meth:`Series.loadDeferred`. Multi-frame data is
+    loaded at the same time, so the number of datasets in a series may change once it is loaded.
+
+    The patient, study and series information is taken from the directory records. A DICOMDIR file is only required to
+    contain a few attributes in each record, so information such as the series description may be missing.
+
+    The DICOMDIR file is read as a regular DICOM file and the directory records are linked using their offsets, so the
+    DICOMDIR support of pydicom, which was deprecated in pydicom 2.0 and removed in pydicom 3.0, is not used.
+
+    Parameters
+    ----------
+    filename : str
+        Filename of the DICOMDIR file
+    patientID : str, optional
+        See :meth:`loadDirectory` for more information on this parameter
+    studyID : str, optional
+        See :meth:`loadDirectory` for more information on this parameter
+    seriesID : str, optional
+        See :meth:`loadDirectory` for more information on this parameter
+    headerOnly : bool, optional
+        See :meth:`loadDirectory` for more information on this parameter
+
+    Raises
+    ------
+    pydicom.errors.InvalidDicomError
+        If the file is not a DICOMDIR file
+    Exception
+        If the DICOMDIR file does not reference any DICOM files
+
+    Returns
+    -------
+    DicomDir or Patient or Study or Series
+        See :meth:`loadDirectory` for more information on the return value
+    """
+
+    DICOMDIR = pydicom.dcmread(filename)
+    if not isDICOMDIRDataset(DICOMDIR):
+        raise InvalidDicomError('File is not a DICOMDIR file: %s' % filename)
+
+    directory = os.path.dirname(os.path.abspath(filename))
+    readFunc = readHeader if headerOnly else readDataset
+
+    dicomDir = DicomDir()
+    hasFiles = False
+
+    # Directory records reference their first child and next sibling by the offset of the record within the file
+    records = DICOMDIR.get('DirectoryRecordSequence', [])
+    recordOffsets = {record.seq_item_tell: record for record in records}
+
+    for patientRecord in getChildRecords(records, 'PATIENT'):
+        for studyRecord in getChildRecords(getLowerRecords(patientRecord, recordOffsets), 'STUDY'):
+            for seriesRecord in getChildRecords(getLowerRecords(studyRecord, recordOffsets), 'SERIES'):
+                # Any record that references a file is included, this includes images as well as other instances such
+                # as structured reports and presentation states
+                filenames = [getReferencedFilename(directory, record)
+                             for record in getChildRecords(getLowerRecords(seriesRecord, recordOffsets))
+                             if 'ReferencedFileID' in record]
+
+                if not filenames:
+                    continue
+
+                hasFiles = True
+
+                if (patientID and patientRecord.get('PatientID') != patientID) or \
+                        (studyID and studyRecord.get('StudyInstanceUID') != studyID) or \
+                        (seriesID and seriesRecord.get('SeriesInstanceUID') != seriesID):
+                    continue
+
+                patient = dicomDir.get(patientRecord.get('PatientID'))
+                if patient is None:
+                    patient = dicomDir.add(Patient(patientRecord))
+
+                study = patient.get(studyRecord.get('StudyInstanceUID'))
+                if study is None:
+                    study = patient.add(Study(studyRecord))
+
+                series = study.get(seriesRecord.get('SeriesInstanceUID'))
+                if series is None:
+                    series = study.add(Series(dataset=seriesRecord))
+                    series._isDeferred = True
+
+                series.extend(DeferredDataset(filename_, readFunc) for filename_ in filenames)
+
+    # Throw an exception if the DICOMDIR does not reference any files
+    if not hasFiles:
+        raise Exception('No DICOM files are referenced by the DICOMDIR file: %s' % filename)
+
+    return getFilteredHierarchy(dicomDir, patientID, studyID, seriesID)
+
+
+def getLowerRecords(record, recordOffsets):
+    """Retrieve the directory records one level below a directory record, such as the studies of a patient
+
+    Parameters
+    ----------
+    record : pydicom.Dataset
+        Directory record to retrieve the lower level records of
+    recordOffsets : dict(int, pydicom.Dataset)
+        Directory records keyed by their offset within the DICOMDIR file
+
+    Returns
+    -------
+    list(pydicom.Dataset)
+        Directory records in the lower level directory entity in order, empty if there are none
+    """
+
+    records = []
+    offset = record.get('OffsetOfReferencedLowerLevelDirectoryEntity')
+
+    # Each record references the next record at the same level, an offset of zero marks the last record
+    while offset and offset in recordOffsets:
+        record = recordOffsets[offset]
+        records.append(record)
+        offset = record.get('OffsetOfTheNextDirectoryRecord')
+
+    return records
+
+
+def getChildRecords(records, recordType=None):
+    """Filter a list of directory records for records in use, optionally of a specific type
+
+    Parameters
+    ----------
+    records : list(pydicom.Dataset)
+        Directory records to filter
+    recordType : str, optional
+        Directory record type, such as 'PATIENT', that the records must be (default is None, which allows all types)
+
+    Returns
+    -------
+    list(pydicom.Dataset)
+        Directory records in use of the given type
+    """
+
+    # Records that have been deleted from the DICOMDIR are marked inactive with a zero in-use flag
+    return [record for record in records if record.get('RecordInUseFlag', 0xFFFF) != 0 and
+            (recordType is None or record.get('DirectoryRecordType') == recordType)]
+
+
+def getReferencedFilename(directory, record):
+    """Retrieve the filename of the file referenced by a directory record
+
+    Parameters
+    ----------
+    directory : str
+        Directory containing the DICOMDIR file, which the referenced file ID is relative to
+    record : pydicom.Dataset
+        Directory record containing the Referenced File ID
+
+    Returns
+    -------
+    str
+        Filename of the referenced file
+    """
+
+    # Referenced File ID is a list of path components, it is a single string if there is only one component
+    fileID = record.ReferencedFileID
+    if isinstance(fileID, str):
+        fileID = [fileID]
+
+    return os.path.join(directory, *fileID)
+
+
+from .headerDataset import readHeader
+from .loadDirectory import getFilteredHierarchy
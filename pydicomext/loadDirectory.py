@@ -1,3 +1,8 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import fnmatch
+import functools
+import itertools
 import os
 
 import pydicom
@@ -5,72 +10,403 @@ import pydicom.filereader
 
 from pydicomext.patient import Patient
 from pydicomext.dicomDir import DicomDir
+from pydicomext.readDatasets import IDENTIFIER_TAGS, iterReadDatasets, readDataset, readDatasets, readIdentifiers
 from pydicomext.series import Series
 from pydicomext.study import Study
+from pydicomext.util import logger, openDICOMFile
 
+# Filename patterns that are skipped by default when searching a directory, DICOMDIR files are DICOM files but do not
+# contain an image
+DEFAULT_EXCLUDE = ('DICOMDIR',)
 
-def loadDirectory(directory, patientID=None, studyID=None, seriesID=None):
-    dicomDir = DicomDir()
-    patient = None
-    study = None
-    series = None
-    seriess = []
 
-    # Search for DICOM files within directory
-    # Append each DICOM file to a list
+def loadDirectory(directory, patientID=None, studyID=None, seriesID=None, workers=None, executor=None, index=None,
+                  include=None, exclude=DEFAULT_EXCLUDE, implicitVR=False, headerOnly=False, useDICOMDIR=True):
+    """Load all DICOM files within a directory and organize them into patients, studies and series
+
+    The directory is searched recursively for files, see :meth:`walkDirectory`. Each file is read and placed into the
+    :class:`DicomDir` hierarchy based on its patient ID, study instance UID and series instance UID. Files are detected
+    by their content rather than their extension, and this check is done when each file is read so every file is only
+    opened once, see :meth:`readDataset`. Files that are not DICOM files, DICOMDIR files and datasets missing any of the
+    identifying tags are skipped.
+
+    Reading the DICOM headers is the most expensive part of loading a directory, so it can optionally be done in
+    parallel by specifying :obj:`workers` or :obj:`executor`. The hierarchy itself is always built on the calling thread
+    in the order the files were found, so the result is identical to reading the files serially.
+
+    If any of :obj:`patientID`, :obj:`studyID` or :obj:`seriesID` are given, the files are read in two phases. First,
+    only the identifying tags of each file are read and then only the matching files are read entirely. When more than
+    one of these is given, a dataset must match all of them to be loaded.
+
+    If the directory contains a DICOMDIR file, such as on a CD or USB export, the hierarchy is built from the DICOMDIR
+    file instead and the directory is not searched. The DICOM files are not read until a series is sorted or combined,
+    see :meth:`loadDICOMDIR` for more information.
+
+    Parameters
+    ----------
+    directory : str
+        Directory to search for DICOM files
+    patientID : str, optional
+        If specified, only datasets with this patient ID are loaded and the :class:`Patient` is returned (default is
+        None, which loads all patients)
+    studyID : str, optional
+        If specified, only datasets with this study instance UID are loaded and the :class:`Study` is returned
+        (default is None, which loads all studies)
+    seriesID : str, optional
+        If specified, only datasets with this series instance UID are loaded and the :class:`Series` is returned
+        (default is None, which loads all series)
+    workers : int, optional
+        Number of threads to use for reading the DICOM files (default is None, which reads the files serially on the
+        calling thread). Ignored if :obj:`executor` is given.
+    executor : :class:`concurrent.futures.Executor`, optional
+        Executor used to read the DICOM files, such as a :class:`concurrent.futures.ProcessPoolExecutor` (default is
+        None). The executor is not shut down after loading.
+    index : str or DirectoryIndex, optional
+        Filename of an index database or a :class:`DirectoryIndex` used to cache the DICOM headers between loads
+        (default is None, which does not use an index). Only files that were added or modified since the last load
+        are read and the hierarchy is built from the header records in the index. Each dataset is a
+        :class:`HeaderDataset` regardless of :obj:`headerOnly`, so the pixel data is only read when it is decoded. The
+        index should only be used for one directory because any files in the index that are not found in the directory
+        are removed.
+    include : list(str), optional
+        See :meth:`walkDirectory` for more information on this parameter
+    exclude : list(str), optional
+        See :meth:`walkDirectory` for more information on this parameter
+    implicitVR : bool, optional
+        Whether to detect DICOM files without the preamble and "DICM" prefix (default is False), see
+        :meth:`isDICOMHeader`
+    headerOnly : bool, optional
+        Whether to load each file as a :class:`HeaderDataset` (default is False). A header dataset only stores the
+        location of the pixel data within the file and reads it when it is decoded, which greatly reduces memory usage
+        when loading many files.
+    useDICOMDIR : bool, optional
+        Whether to build the hierarchy from a DICOMDIR file in the directory when one is present (default is True). The
+        :obj:`workers`, :obj:`executor`, :obj:`index`, :obj:`include`, :obj:`exclude` and :obj:`implicitVR` parameters
+        are ignored when a DICOMDIR file is used.
+
+    Raises
+    ------
+    Exception
+        If no DICOM files are found within the directory
+
+    Returns
+    -------
+    DicomDir or Patient or Study or Series
+        :class:`Patient` if :obj:`patientID` is given, otherwise :class:`Study` if :obj:`studyID` is given, otherwise
+        :class:`Series` if :obj:`seriesID` is given. If none of these are given, a :class:`DicomDir` is returned. None
+        is returned if no datasets match the given IDs
+    """
+
+    # The DICOMDIR file is an index of the DICOM files on the media, using it avoids searching and reading every file
+    DICOMDIRFilename = os.path.join(directory, 'DICOMDIR')
+    if useDICOMDIR and os.path.isfile(DICOMDIRFilename):
+        return loadDICOMDIR(DICOMDIRFilename, patientID, studyID, seriesID, headerOnly)
+
+    # Search for files within directory
+    # Append each file to a list, whether each file is a DICOM file is checked when it is read
     DCMFilenames = []
-    for dirName, subdirs, filenames in os.walk(directory):
-        for filename in filenames:
-            if filename.endswith('.dcm'):
-                DCMFilenames.append(os.path.join(dirName, filename))
+    for dirName, filenames in walkDirectory(directory, include, exclude):
+        DCMFilenames.extend(filenames)
 
-    # Throw an exception if there are no DICOM files in the given directory
+    # Throw an exception if there are no files in the given directory
     if not DCMFilenames:
         raise Exception('No DICOM files were found in the directory: %s' % directory)
 
-    # Loop through each DICOM filename
-    for filename in DCMFilenames:
-        # Read DICOM file
-        # Set defer_size to be 2048 bytes which means any data larger than this will not be read until it is first
-        # used in code. This should primarily be the pixel data
-        dataset = pydicom.dcmread(filename, defer_size=2048)
+    if index is not None:
+        # Only read files that are not in the index or have been modified, the index takes care of the filtering
+        if isinstance(index, DirectoryIndex):
+            dicomDir = index.load(DCMFilenames, patientID, studyID, seriesID, workers, executor, implicitVR)
+        else:
+            with DirectoryIndex(index) as index_:
+                dicomDir = index_.load(DCMFilenames, patientID, studyID, seriesID, workers, executor, implicitVR)
+    else:
+        readFunc = functools.partial(readHeader if headerOnly else readDataset, implicitVR=implicitVR)
 
-        if patientID:
-            if dataset.PatientID != patientID:
-                continue
+        # When filtering for a patient, study or series, only the identifying tags are read first. This is much
+        # cheaper than reading the entire header and allows the full read to be limited to the files that are wanted
+        if patientID or studyID or seriesID:
+            identifiers = readDatasets(DCMFilenames, workers, executor,
+                                       functools.partial(readIdentifiers, implicitVR=implicitVR))
+            DCMFilenames = [filename for filename, dataset in zip(DCMFilenames, identifiers)
+                            if dataset is not None and isDatasetMatch(dataset, patientID, studyID, seriesID)]
+
+        datasets = readDatasets(DCMFilenames, workers, executor, readFunc)
+        dicomDir = buildHierarchy(datasets, patientID, studyID, seriesID)
+
+    # Throw an exception if none of the files are DICOM files, when filtering None is returned instead
+    if not (patientID or studyID or seriesID) and not dicomDir:
+        raise Exception('No DICOM files were found in the directory: %s' % directory)
+
+    return dicomDir
+
+
+def iterDirectory(directory, workers=None, executor=None, include=None, exclude=DEFAULT_EXCLUDE, implicitVR=False,
+                  headerOnly=False):
+    """Iterate over the DICOM files within a directory, reading each file as it is found
+
+    Unlike :meth:`loadDirectory`, the directory is not searched entirely before reading the files. Instead, the files
+    of each directory are read and yielded as soon as the directory is found, so memory usage does not depend on the
+    number of files in the directory tree. When reading in parallel, the reads are not interrupted at the end of each
+    directory, at most :obj:`READ_WINDOW` reads are queued ahead of the dataset being yielded across the entire search.
+
+    Parameters
+    ----------
+    directory : str
+        Directory to search for DICOM files
+    workers : int, optional
+        Number of threads to use for reading the DICOM files (default is None, which reads the files serially on the
+        calling thread). One thread pool is used for the entire search. Ignored if :obj:`executor` is given.
+    executor : :class:`concurrent.futures.Executor`, optional
+        Executor used to read the DICOM files (default is None). The executor is not shut down.
+    include : list(str), optional
+        See :meth:`walkDirectory` for more information on this parameter
+    exclude : list(str), optional
+        See :meth:`walkDirectory` for more information on this parameter
+    implicitVR : bool, optional
+        See :meth:`loadDirectory` for more information on this parameter
+    headerOnly : bool, optional
+        See :meth:`loadDirectory` for more information on this parameter
+
+    Returns
+    -------
+    iterator(tuple(str, pydicom.Dataset))
+        Iterator of the filename and dataset of each DICOM file, in the same order as :meth:`loadDirectory` reads them.
+        Files that are not DICOM files are skipped
+    """
+
+    # Use one thread pool for the entire search rather than one per directory
+    if executor is None and workers is not None and workers > 1:
+        with ThreadPoolExecutor(workers) as executor:
+            yield from iterDirectory(directory, None, executor, include, exclude, implicitVR, headerOnly)
+
+        return
 
-            patient = Patient(dataset)
+    readFunc = functools.partial(readHeader if headerOnly else readDataset, implicitVR=implicitVR)
+
+    # Filenames are found as the reads are submitted, so the reads continue from one directory into the next
+    filenames, readFilenames = itertools.tee(filename for _, filenames_ in walkDirectory(directory, include, exclude)
+                                             for filename in filenames_)
+
+    if executor is None:
+        datasets = map(readFunc, readFilenames)
+    else:
+        datasets = iterReadDatasets(readFilenames, executor, readFunc)
+
+    for filename, dataset in zip(filenames, datasets):
+        if dataset is not None:
+            yield filename, dataset
+
+
+def iterSeries(directory, workers=None, executor=None, include=None, exclude=DEFAULT_EXCLUDE, implicitVR=False,
+               headerOnly=False):
+    """Iterate over the series within a directory, yielding each series once all of its DICOM files have been read
+
+    The directory tree is searched and read in the same manner as :meth:`iterDirectory`. A series is considered
+    complete once the search leaves the directory containing its DICOM files, including any subdirectories, at which
+    point the series is yielded. Only the series that are currently being read are kept in memory, so a series can be
+    sorted and combined while the remainder of the directory tree is still being searched.
+
+    This assumes that all of the DICOM files of a series are contained within one directory or its subdirectories,
+    which is typically the case. If more DICOM files of a series are found after it has been yielded, a warning is
+    given and these files are yielded as another series with the same ID.
+
+    Since a series is only complete once its directory has been left, every series in a directory is held in memory
+    until the whole directory has been read. For a flat directory that contains the files of many series, such as
+    many PACS exports, nothing is yielded until the entire directory is read and the memory usage is the same as
+    :meth:`loadDirectory`.
+
+    Parameters
+    ----------
+    directory : str
+        Directory to search for DICOM files
+    workers : int, optional
+        See :meth:`iterDirectory` for more information on this parameter
+    executor : :class:`concurrent.futures.Executor`, optional
+        See :meth:`iterDirectory` for more information on this parameter
+    include : list(str), optional
+        See :meth:`walkDirectory` for more information on this parameter
+    exclude : list(str), optional
+        See :meth:`walkDirectory` for more information on this parameter
+    implicitVR : bool, optional
+        See :meth:`loadDirectory` for more information on this parameter
+    headerOnly : bool, optional
+        See :meth:`loadDirectory` for more information on this parameter
+
+    Returns
+    -------
+    iterator(Series)
+        Iterator of each series, with any multi-frame data loaded
+    """
+
+    # Series that are being read along with the directory their first file was found in
+    pendingSeries = OrderedDict()
+    completedIDs = set()
+    currentDirName = None
+
+    for filename, dataset in iterDirectory(directory, workers, executor, include, exclude, implicitVR, headerOnly):
+        dirName = os.path.dirname(filename)
+
+        # Directories are searched top-down, so once the search is outside of a series directory it is complete
+        if dirName != currentDirName:
+            for ID, (series, seriesDirName) in list(pendingSeries.items()):
+                if not isSubdirectory(dirName, seriesDirName):
+                    del pendingSeries[ID]
+                    completedIDs.add(ID)
+                    series.loadMultiFrame()
+                    yield series
+
+            currentDirName = dirName
+
+        if not hasIdentifiers(dataset):
+            continue
+
+        ID = dataset.SeriesInstanceUID
+        if ID in pendingSeries:
+            series, _ = pendingSeries[ID]
         else:
-            # Check for existing patient, if not add new patient
-            if dataset.PatientID in dicomDir:
-                patient = dicomDir[dataset.PatientID]
-            else:
-                patient = dicomDir.add(dataset)
-
-        if studyID:
-            if dataset.StudyInstanceUID != studyID:
+            if ID in completedIDs:
+                logger.warning('More DICOM files were found for series %s after it was completed, these will be '
+                               'yielded as a separate series' % ID)
+
+            series = Series(dataset=dataset)
+            pendingSeries[ID] = (series, dirName)
+
+        series.append(dataset)
+
+    for series, _ in pendingSeries.values():
+        series.loadMultiFrame()
+        yield series
+
+
+def walkDirectory(directory, include=None, exclude=DEFAULT_EXCLUDE):
+    """Search a directory recursively for files that may be DICOM files
+
+    Only the filenames are checked against :obj:`include` and :obj:`exclude`, the files are not opened. Whether each
+    file is a DICOM file is checked when it is read, see :meth:`readDataset`, so that each file is only opened once.
+
+    Parameters
+    ----------
+    directory : str
+        Directory to search for DICOM files
+    include : list(str), optional
+        Filename patterns, such as '*.dcm', that a file must match at least one of to be included (default is None,
+        which includes all files). See :mod:`fnmatch` for the pattern syntax.
+    exclude : list(str), optional
+        Filename patterns of files that are skipped (default is :obj:`DEFAULT_EXCLUDE`, which skips DICOMDIR files)
+
+    Returns
+    -------
+    iterator(tuple(str, list(str)))
+        Iterator of each directory in top-down order along with the filenames of the files in it. Directories without
+        any files are skipped
+    """
+
+    try:
+        with os.scandir(directory) as it:
+            entries = list(it)
+    except OSError:
+        # Skip directories that cannot be listed, the same as os.walk
+        return
+
+    filenames = []
+    subdirs = []
+    for entry in entries:
+        try:
+            if entry.is_dir():
+                # Symbolic links to directories are not followed, the same as os.walk
+                if not entry.is_symlink():
+                    subdirs.append(entry.path)
+                continue
+            elif not entry.is_file():
                 continue
+        except OSError:
+            continue
+
+        if include is not None and not any(fnmatch.fnmatch(entry.name, pattern) for pattern in include):
+            continue
+
+        if exclude and any(fnmatch.fnmatch(entry.name, pattern) for pattern in exclude):
+            continue
+
+        filenames.append(entry.path)
+
+    if filenames:
+        yield directory, filenames
+
+    for subdir in subdirs:
+        yield from walkDirectory(subdir, include, exclude)
+
+
+def isSubdirectory(path, directory):
+    """Check whether a path is the same as a directory or is within it
+
+    Parameters
+    ----------
+    path : str
+    directory : str
+
+    Returns
+    -------
+    bool
+    """
+
+    return path == directory or path.startswith(os.path.join(directory, ''))
+
+
+def buildHierarchy(datasets, patientID=None, studyID=None, seriesID=None):
+    """Organize an iterable of datasets into patients, studies and series
+
+    Datasets that are None, such as files that are not DICOM files, are skipped. Datasets that are missing any of the
+    identifying tags are skipped with a warning.
+
+    Parameters
+    ----------
+    datasets : iterable(pydicom.Dataset or None)
+        Datasets to organize, these are added to the series in the order given
+    patientID : str, optional
+        See :meth:`loadDirectory` for more information on this parameter
+    studyID : str, optional
+        See :meth:`loadDirectory` for more information on this parameter
+    seriesID : str, optional
+        See :meth:`loadDirectory` for more information on this parameter
+
+    Returns
+    -------
+    DicomDir or Patient or Study or Series
+        See :meth:`loadDirectory` for more information on the return value
+    """
+
+    dicomDir = DicomDir()
+    seriess = []
+
+    # Loop through each DICOM dataset
+    for dataset in datasets:
+        # Skip any files that are not DICOM files or cannot be placed in the hierarchy
+        if dataset is None or not hasIdentifiers(dataset):
+            continue
 
-            study = Study(dataset)
+        # Skip any datasets that do not match the patient, study or series being filtered for
+        if not isDatasetMatch(dataset, patientID, studyID, seriesID):
+            continue
+
+        # Check for existing patient, if not add new patient
+        if dataset.PatientID in dicomDir:
+            patient = dicomDir[dataset.PatientID]
         else:
-            # Check for existing study for patient, if not add a new study
-            if dataset.StudyInstanceUID in patient:
-                study = patient[dataset.StudyInstanceUID]
-            else:
-                study = patient.add(dataset)
-
-        if seriesID:
-            if dataset.SeriesInstanceUID != seriesID:
-                continue
+            patient = dicomDir.add(dataset)
 
-            series = Series(dataset=dataset)
+        # Check for existing study for patient, if not add a new study
+        if dataset.StudyInstanceUID in patient:
+            study = patient[dataset.StudyInstanceUID]
         else:
-            # Check for existing series within study, if not add a new series
-            if dataset.SeriesInstanceUID in study:
-                series = study[dataset.SeriesInstanceUID]
-            else:
-                series = study.add(dataset)
-                seriess.append(series)
+            study = patient.add(dataset)
+
+        # Check for existing series within study, if not add a new series
+        if dataset.SeriesInstanceUID in study:
+            series = study[dataset.SeriesInstanceUID]
+        else:
+            series = study.add(dataset)
+            seriess.append(series)
 
         # Append image to series
         series.append(dataset)
@@ -79,11 +415,89 @@ def loadDirectory(directory, patientID=None, studyID=None, seriesID=None):
     for series in seriess:
         series.loadMultiFrame()
 
+    return getFilteredHierarchy(dicomDir, patientID, studyID, seriesID)
+
+
+def getFilteredHierarchy(dicomDir, patientID=None, studyID=None, seriesID=None):
+    """Retrieve the most specific part of a hierarchy that was filtered for
+
+    Parameters
+    ----------
+    dicomDir : DicomDir
+        Hierarchy containing only the datasets that match the filter
+    patientID : str, optional
+        See :meth:`loadDirectory` for more information on this parameter
+    studyID : str, optional
+        See :meth:`loadDirectory` for more information on this parameter
+    seriesID : str, optional
+        See :meth:`loadDirectory` for more information on this parameter
+
+    Returns
+    -------
+    DicomDir or Patient or Study or Series
+        See :meth:`loadDirectory` for more information on the return value, None if nothing matched the filter
+    """
+
     if patientID:
-        return patient
+        return dicomDir.get(patientID)
     elif studyID:
-        return study
+        return next((patient[studyID] for patient in dicomDir.values() if studyID in patient), None)
     elif seriesID:
-        return series
+        return next((study[seriesID] for patient in dicomDir.values() for study in patient.values()
+                     if seriesID in study), None)
     else:
         return dicomDir
+
+
+def hasIdentifiers(dataset):
+    """Check whether a dataset has the tags that identify its patient, study and series, giving a warning if not
+
+    Parameters
+    ----------
+    dataset : pydicom.Dataset
+        Dataset to check
+
+    Returns
+    -------
+    bool
+        True if the dataset has a patient ID, study instance UID and series instance UID, False otherwise
+    """
+
+    missing = [keyword for keyword in IDENTIFIER_TAGS if keyword not in dataset]
+
+    if missing:
+        logger.warning('Skipping %s, it is missing the tags %s' % (getattr(dataset, 'filename', 'dataset'),
+                                                                   ', '.join(missing)))
+        return False
+
+    return True
+
+
+def isDatasetMatch(dataset, patientID=None, studyID=None, seriesID=None):
+    """Check whether a dataset matches the patient ID, study instance UID and series instance UID given
+
+    Parameters
+    ----------
+    dataset : pydicom.Dataset
+        Dataset to check
+    patientID : str, optional
+        Patient ID to match, not checked if None
+    studyID : str, optional
+        Study instance UID to match, not checked if None
+    seriesID : str, optional
+        Series instance UID to match, not checked if None
+
+    Returns
+    -------
+    bool
+        True if the dataset matches all of the given IDs, False otherwise
+    """
+
+    return (not patientID or dataset.get('PatientID') == patientID) and \
+        (not studyID or dataset.get('StudyInstanceUID') == studyID) and \
+        (not seriesID or dataset.get('SeriesInstanceUID') == seriesID)
+
+
+from .directoryIndex import DirectoryIndex
+from .headerDataset import readHeader
+from .loadDICOMDIR import loadDICOMDIR
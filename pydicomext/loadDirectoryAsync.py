@@ -0,0 +1,113 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import os
+
+from pydicomext.headerDataset import readHeader
+from pydicomext.loadDICOMDIR import loadDICOMDIR
+from pydicomext.loadDirectory import DEFAULT_EXCLUDE, buildHierarchy, walkDirectory
+from pydicomext.readDatasets import readDataset
+
+
+async def loadDirectoryAsync(directory, patientID=None, studyID=None, seriesID=None, concurrency=32, readFunc=None,
+                             include=None, exclude=DEFAULT_EXCLUDE, implicitVR=False, headerOnly=False,
+                             useDICOMDIR=True):
+    """Load all DICOM files within a directory using asyncio and organize them into patients, studies and series
+
+    This is an asynchronous version of :meth:`loadDirectory` meant for network filesystems where the time to open a
+    file is much larger than the time to read it. Up to :obj:`concurrency` files are opened and read at the same time,
+    which hides most of the latency of each file. Only :obj:`concurrency` reads are pending at any time rather than one
+    for every file. The resulting hierarchy contains the same patients, studies and
+    series as :meth:`loadDirectory`. If the directory contains a DICOMDIR file, the hierarchy is built from it in the
+    same manner as :meth:`loadDirectory` and the DICOM files are not read, see :meth:`loadDICOMDIR`.
+
+    Since opening a file is the expensive part, each file is only opened once. Searching the directory only lists the
+    files and whether each file is a DICOM file is checked when it is read. Unlike :meth:`loadDirectory`, the
+    identifying tags are not read separately first, so if any of :obj:`patientID`, :obj:`studyID` or :obj:`seriesID`
+    are given, every file is read entirely and the datasets that do not match are discarded.
+
+    Parameters
+    ----------
+    directory : str
+        Directory to search for DICOM files
+    patientID : str, optional
+        See :meth:`loadDirectory` for more information on this parameter
+    studyID : str, optional
+        See :meth:`loadDirectory` for more information on this parameter
+    seriesID : str, optional
+        See :meth:`loadDirectory` for more information on this parameter
+    concurrency : int, optional
+        Maximum number of files that are read at the same time (default is 32)
+    readFunc : callable, optional
+        Function that takes a filename and returns the dataset, or None if the file is not a DICOM file (default is
+        None, which uses :meth:`readDataset` or :meth:`readHeader`). This can be a regular function, which is called in
+        a thread, or a coroutine function, which is awaited. This is mainly useful for simulating a slow filesystem.
+    include : list(str), optional
+        See :meth:`walkDirectory` for more information on this parameter
+    exclude : list(str), optional
+        See :meth:`walkDirectory` for more information on this parameter
+    implicitVR : bool, optional
+        See :meth:`loadDirectory` for more information on this parameter. Only used if :obj:`readFunc` is None
+    headerOnly : bool, optional
+        See :meth:`loadDirectory` for more information on this parameter. Only used if :obj:`readFunc` is None or a
+        DICOMDIR file is used
+    useDICOMDIR : bool, optional
+        See :meth:`loadDirectory` for more information on this parameter. The :obj:`concurrency`, :obj:`readFunc`,
+        :obj:`include`, :obj:`exclude` and :obj:`implicitVR` parameters are ignored when a DICOMDIR file is used.
+
+    Raises
+    ------
+    Exception
+        If no DICOM files are found within the directory
+
+    Returns
+    -------
+    DicomDir or Patient or Study or Series
+        See :meth:`loadDirectory` for more information on the return value
+    """
+
+    if readFunc is None:
+        readFunc = functools.partial(readHeader if headerOnly else readDataset, implicitVR=implicitVR)
+
+    # The running loop is returned since this is called from within a coroutine
+    loop = asyncio.get_event_loop()
+
+    # The DICOMDIR file is an index of the DICOM files on the media, using it avoids searching and reading every file
+    DICOMDIRFilename = os.path.join(directory, 'DICOMDIR')
+    if useDICOMDIR and await loop.run_in_executor(None, os.path.isfile, DICOMDIRFilename):
+        return await loop.run_in_executor(None, loadDICOMDIR, DICOMDIRFilename, patientID, studyID, seriesID,
+                                          headerOnly)
+
+    # The reads are blocking calls so they are done in a thread pool large enough to reach the concurrency limit
+    with ThreadPoolExecutor(concurrency) as executor:
+        # Searching the directory is blocking as well, but only lists each directory rather than opening the files
+        def findFilenames():
+            return [filename for _, filenames in walkDirectory(directory, include, exclude) for filename in filenames]
+
+        DCMFilenames = await loop.run_in_executor(executor, findFilenames)
+
+        # Throw an exception if there are no files in the given directory
+        if not DCMFilenames:
+            raise Exception('No DICOM files were found in the directory: %s' % directory)
+
+        # Each reader takes the next file once its previous read finishes, so only one read per reader is pending
+        # rather than a task for every file. Datasets are stored by index to keep the order of the filenames
+        datasets = [None] * len(DCMFilenames)
+        pendingFilenames = iter(enumerate(DCMFilenames))
+
+        async def read():
+            for index, filename in pendingFilenames:
+                if asyncio.iscoroutinefunction(readFunc):
+                    datasets[index] = await readFunc(filename)
+                else:
+                    datasets[index] = await loop.run_in_executor(executor, readFunc, filename)
+
+        await asyncio.gather(*[read() for _ in range(min(concurrency, len(DCMFilenames)))])
+
+    dicomDir = buildHierarchy(datasets, patientID, studyID, seriesID)
+
+    # Throw an exception if none of the files are DICOM files, when filtering None is returned instead
+    if not (patientID or studyID or seriesID) and not dicomDir:
+        raise Exception('No DICOM files were found in the directory: %s' % directory)
+
+    return dicomDir
@@ -54,11 +54,14 @@ def mergeSeries(seriess, indices=None):
         # Loop through and add each series' datasets to the merged series
         # Use boolean OR to figure out if multi frame datasets exist
         for series in seriess:
-            mergedSeries._isMultiFrame |= series._isMultiFrame
+            mergedSeries._isMultiFrame |= series.isMultiFrame
             mergedSeries.extend(series)
     else:
         # Loop through each series and add the specified datasets to the merged series
         for series, indices_ in zip(seriess, indices):
+            # Indices refer to the datasets after any deferred datasets are loaded and multi-frame data is expanded
+            series.loadDeferred()
+
             # If the indices is iterable, then we add using itemgetter to retrieve all of the indices
             # Otherwise, add to the list if it is an integer
             if hasattr(indices_, '__iter__') and len(indices_) > 0:
@@ -0,0 +1,273 @@
+from collections import OrderedDict
+
+import numpy as np
+from pydicom.valuerep import DT
+
+from pydicomext.frameDataset import FrameDataset
+from pydicomext.util import getSequenceValue
+
+# Columns of the metadata table and the number of values per dataset, a width of 1 creates a 1D column
+COLUMNS = OrderedDict([
+    ('positions', 3),
+    ('orientations', 6),
+    ('pixelSpacings', 2),
+    ('imageShapes', 3),
+    ('sliceThicknesses', 1),
+    ('spacingBetweenSlices', 1),
+    ('sliceLocations', 1),
+    ('triggerTimes', 1),
+    ('acquisitionDateTimes', 1),
+    ('instanceNumbers', 1),
+    ('stackIDs', 1),
+    ('inStackPositions', 1),
+    ('temporalPositionIndices', 1),
+    ('frameAcquisitionNumbers', 1),
+    ('cardiacTriggerTimes', 1),
+    ('cardiacPercentages', 1),
+    ('rescaleSlopes', 1),
+    ('rescaleIntercepts', 1),
+])
+
+# Columns that are retrieved from the functional groups of multi-frame datasets along with the sequence and keyword
+FUNCTIONAL_GROUP_COLUMNS = [
+    ('positions', 'PlanePositionSequence', 'ImagePositionPatient'),
+    ('orientations', 'PlaneOrientationSequence', 'ImageOrientationPatient'),
+    ('pixelSpacings', 'PixelMeasuresSequence', 'PixelSpacing'),
+    ('sliceThicknesses', 'PixelMeasuresSequence', 'SliceThickness'),
+    ('spacingBetweenSlices', 'PixelMeasuresSequence', 'SpacingBetweenSlices'),
+    ('cardiacTriggerTimes', 'CardiacSynchronizationSequence', 'NominalCardiacTriggerDelayTime'),
+    ('cardiacPercentages', 'CardiacSynchronizationSequence', 'NominalPercentageOfCardiacPhase'),
+    ('rescaleSlopes', 'PixelValueTransformationSequence', 'RescaleSlope'),
+    ('rescaleIntercepts', 'PixelValueTransformationSequence', 'RescaleIntercept'),
+]
+
+
+class SeriesMetadata():
+    """Table of metadata for each dataset in a series stored as NumPy arrays
+
+    The table is stored column-wise where each column is an array with one row per dataset in the series. Any value
+    that is missing from a dataset is NaN. For multi-frame series, the values are retrieved from the frame functional
+    groups, see :meth:`getFrameMetadata`.
+
+    The following columns are available:
+    * positions - Image Position (Patient), shape (N, 3)
+    * orientations - Image Orientation (Patient), shape (N, 6)
+    * pixelSpacings - Pixel Spacing, shape (N, 2)
+    * imageShapes - Rows, Columns and Samples per Pixel, shape (N, 3)
+    * sliceThicknesses - Slice Thickness, shape (N,)
+    * spacingBetweenSlices - Spacing Between Slices, shape (N,)
+    * sliceLocations - Slice Location, shape (N,)
+    * triggerTimes - Trigger Time, shape (N,)
+    * acquisitionDateTimes - Acquisition Date Time (Frame Acquisition Date Time for multi-frame) as a timestamp in
+      milliseconds, shape (N,)
+    * instanceNumbers - Instance Number, shape (N,)
+    * stackIDs - Stack ID, NaN if not an integer, shape (N,)
+    * inStackPositions - In-Stack Position Number, shape (N,)
+    * temporalPositionIndices - Temporal Position Index, shape (N,)
+    * frameAcquisitionNumbers - Frame Acquisition Number, shape (N,)
+    * cardiacTriggerTimes - Nominal Cardiac Trigger Delay Time, shape (N,)
+    * cardiacPercentages - Nominal Percentage of Cardiac Phase, shape (N,)
+    * rescaleSlopes - Rescale Slope (Pixel Value Transformation Sequence for multi-frame), shape (N,)
+    * rescaleIntercepts - Rescale Intercept (Pixel Value Transformation Sequence for multi-frame), shape (N,)
+
+    The metadata of a series should be retrieved through :attr:`Series.metadata` which caches the table until the
+    series is modified.
+
+    Parameters
+    ----------
+    series : Series, optional
+        Series to create the table from (default is None, which creates an empty table)
+    count : int, optional
+        Number of rows in the table (default is None, which uses the length of the series). The values are NaN if no
+        series is given.
+    """
+
+    def __init__(self, series=None, count=None):
+        if count is None:
+            count = len(series) if series is not None else 0
+
+        for name, width in COLUMNS.items():
+            setattr(self, name, np.full((count, width) if width > 1 else count, np.nan))
+
+        if series is None:
+            return
+
+        # Frames are grouped by their parent so that the metadata of each parent is copied all at once
+        frameIndices = OrderedDict()
+        for index, dataset in enumerate(series):
+            if isinstance(dataset, FrameDataset):
+                frameIndices.setdefault(id(dataset.parent), (dataset.parent, [], []))
+                frameIndices[id(dataset.parent)][1].append(index)
+                frameIndices[id(dataset.parent)][2].append(dataset.sliceIndex)
+            else:
+                self._readStandard(index, dataset)
+
+        for parent, indices, sliceIndices in frameIndices.values():
+            frameMetadata = getFrameMetadata(parent)
+
+            for name in COLUMNS:
+                getattr(self, name)[indices] = getattr(frameMetadata, name)[sliceIndices]
+
+    def _set(self, name, index, value):
+        """Set a value in a column, leaving the value as NaN if it is missing or invalid"""
+
+        if value is None:
+            return
+
+        try:
+            getattr(self, name)[index] = value
+        except (TypeError, ValueError):
+            pass
+
+    def _readImage(self, index, dataset):
+        self._set('imageShapes', index, (dataset.get('Rows'), dataset.get('Columns'),
+                                         dataset.get('SamplesPerPixel', 1)))
+        self._set('instanceNumbers', index, dataset.get('InstanceNumber'))
+
+    def _readStandard(self, index, dataset):
+        self._readImage(index, dataset)
+
+        self._set('positions', index, dataset.get('ImagePositionPatient'))
+        self._set('orientations', index, dataset.get('ImageOrientationPatient'))
+        self._set('pixelSpacings', index, dataset.get('PixelSpacing'))
+        self._set('sliceThicknesses', index, dataset.get('SliceThickness'))
+        self._set('spacingBetweenSlices', index, dataset.get('SpacingBetweenSlices'))
+        self._set('sliceLocations', index, dataset.get('SliceLocation'))
+        self._set('triggerTimes', index, dataset.get('TriggerTime'))
+        self._set('rescaleSlopes', index, dataset.get('RescaleSlope'))
+        self._set('rescaleIntercepts', index, dataset.get('RescaleIntercept'))
+
+        self._set('acquisitionDateTimes', index, getTimestamp(dataset.get('AcquisitionDateTime')))
+
+    def _readFrame(self, index, frameGroups, sharedGroups):
+        """Read the functional groups of a frame, using the shared functional groups for any that are not per-frame"""
+
+        for name, sequenceKeyword, keyword in FUNCTIONAL_GROUP_COLUMNS:
+            value = getSequenceValue(frameGroups, sequenceKeyword, keyword)
+
+            if value is None and sharedGroups is not None:
+                value = getSequenceValue(sharedGroups, sequenceKeyword, keyword)
+
+            self._set(name, index, value)
+
+        frameContent = frameGroups.get('FrameContentSequence')
+        if not frameContent and sharedGroups is not None:
+            frameContent = sharedGroups.get('FrameContentSequence')
+
+        if frameContent:
+            frameContent = frameContent[0]
+
+            stackID = frameContent.get('StackID')
+            if stackID and stackID.isdigit():
+                self._set('stackIDs', index, int(stackID))
+
+            self._set('inStackPositions', index, frameContent.get('InStackPositionNumber'))
+            self._set('temporalPositionIndices', index, frameContent.get('TemporalPositionIndex'))
+            self._set('frameAcquisitionNumbers', index, frameContent.get('FrameAcquisitionNumber'))
+
+            self._set('acquisitionDateTimes', index, getTimestamp(frameContent.get('FrameAcquisitionDateTime')))
+
+    def take(self, indices):
+        """Create a new table containing only the given rows in the given order
+
+        Parameters
+        ----------
+        indices : list(int) or numpy.ndarray
+            Indices of the rows to take
+
+        Returns
+        -------
+        SeriesMetadata
+            New table with the rows
+        """
+
+        metadata = SeriesMetadata()
+
+        for name in COLUMNS:
+            setattr(metadata, name, getattr(self, name)[indices])
+
+        return metadata
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __str__(self):
+        return 'SeriesMetadata [%i datasets]' % len(self)
+
+    def __repr__(self):
+        return self.__str__()
+
+
+def getTimestamp(value):
+    """Convert a date time value to a timestamp in milliseconds
+
+    The value is a string rather than a datetime when pydicom's datetime conversion is disabled, in which case it is
+    parsed here.
+
+    Parameters
+    ----------
+    value : pydicom.valuerep.DT or str or None
+        Date time value
+
+    Returns
+    -------
+    float or None
+        Timestamp in milliseconds, None if the value is missing or is not a valid date time
+    """
+
+    if not value:
+        return None
+
+    if isinstance(value, str):
+        try:
+            value = DT(value)
+        except ValueError:
+            return None
+
+    return value.timestamp() * 1000.0
+
+
+def getFrameMetadata(parent):
+    """Retrieve the metadata table for each frame of a multi-frame dataset
+
+    Each functional group is retrieved from the Per-frame Functional Groups Sequence of the frame if present, otherwise
+    from the Shared Functional Groups Sequence. The nested sequences are only traversed once per dataset since the
+    table is cached in the dataset. If the functional groups of the dataset are modified, the cached table is removed by
+    :meth:`Series.clearCache` for any series containing its frames.
+
+    Parameters
+    ----------
+    parent : pydicom.Dataset
+        Multi-frame dataset
+
+    Returns
+    -------
+    SeriesMetadata
+        Table with one row per frame of the dataset
+    """
+
+    frameMetadata = getattr(parent, '_frameMetadata', None)
+    if frameMetadata is not None:
+        return frameMetadata
+
+    perFrameGroups = parent.PerFrameFunctionalGroupsSequence
+    sharedGroups = parent.get('SharedFunctionalGroupsSequence')
+    sharedGroups = sharedGroups[0] if sharedGroups else None
+
+    frameMetadata = SeriesMetadata(count=len(perFrameGroups))
+
+    # Image shape and instance number come from the dataset itself and are the same for every frame
+    frameMetadata._readImage(slice(None), parent)
+
+    for index, frameGroups in enumerate(perFrameGroups):
+        frameMetadata._readFrame(index, frameGroups, sharedGroups)
+
+    # Some multi-frame datasets store the rescale values in the dataset itself rather than in the functional groups
+    for name, keyword in [('rescaleSlopes', 'RescaleSlope'), ('rescaleIntercepts', 'RescaleIntercept')]:
+        column = getattr(frameMetadata, name)
+        if keyword in parent:
+            frameMetadata._set(name, np.isnan(column), parent.get(keyword))
+
+    parent._frameMetadata = frameMetadata
+
+    return frameMetadata
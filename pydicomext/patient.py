@@ -4,6 +4,9 @@ from pydicomext.study import Study
 
 
 class Patient(dict):
+    __slots__ = ('name', 'ID', 'issuerOfID', 'birthDate', 'birthTime', 'sex', 'otherIDs', 'otherNames', 'age', 'size',
+                 'weight', 'ethnicGroup', 'comments', 'identityRemoved', 'position')
+
     def __init__(self, DCMImage=None):
         if DCMImage:
             self.name = DCMImage.get('PatientName')
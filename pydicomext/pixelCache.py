@@ -0,0 +1,174 @@
+from collections import OrderedDict
+import threading
+
+import numpy as np
+
+from pydicomext.frameDataset import FrameDataset
+
+
+class PixelCache():
+    """Least-recently-used cache of decoded images shared by every series in the process
+
+    Decoding the pixel data is the most expensive part of combining a series, so combining the same images more than
+    once, such as after sorting a series again with different methods or after merging series, decodes each image
+    again. When the cache is enabled, :meth:`combineSeries` and :class:`LazyArray` store each decoded image in the
+    cache and take images from the cache instead of decoding them when possible.
+
+    Images are keyed by the SOP instance UID of their dataset along with the frame index for multi-frame datasets, see
+    :meth:`getPixelCacheKey`. The cache stores the decoded pixel data before any rescaling is applied. Cached images are
+    read-only copies so they are not modified when the volume that they were placed in is modified.
+
+    The cache is disabled by default. Set :attr:`maxBytes` on :obj:`pixelCache` to enable it, for example::
+
+        pydicomext.pixelCache.maxBytes = 512 * 1024 ** 2
+
+    Parameters
+    ----------
+    maxBytes : int, optional
+        Maximum total size of the cached images in bytes (default is 0, which disables the cache). When adding an image
+        would exceed this, the least recently used images are removed. Images larger than this are not cached.
+    """
+
+    def __init__(self, maxBytes=0):
+        self._maxBytes = maxBytes
+        self._images = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Number of bytes of the images currently in the cache
+        self.nbytes = 0
+
+        # Number of times an image was found or not found in the cache
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def maxBytes(self):
+        """Maximum total size of the cached images in bytes, 0 if the cache is disabled"""
+
+        return self._maxBytes
+
+    @maxBytes.setter
+    def maxBytes(self, maxBytes):
+        with self._lock:
+            self._maxBytes = maxBytes
+            self._evict()
+
+    @property
+    def isEnabled(self):
+        """Whether the cache is enabled, i.e. :attr:`maxBytes` is greater than 0"""
+
+        return self._maxBytes > 0
+
+    def get(self, key):
+        """Retrieve a decoded image from the cache
+
+        Parameters
+        ----------
+        key : tuple or None
+            Key of the image, see :meth:`getPixelCacheKey`. If None, None is returned without being counted as a miss
+
+        Returns
+        -------
+        numpy.ndarray or None
+            Read-only decoded image, None if the image is not in the cache or the cache is disabled
+        """
+
+        if key is None or not self.isEnabled:
+            return None
+
+        with self._lock:
+            image = self._images.get(key)
+
+            if image is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._images.move_to_end(key)
+
+        return image
+
+    def put(self, key, image):
+        """Add a decoded image to the cache
+
+        Nothing is done if the key is None, the cache is disabled or the image is larger than :attr:`maxBytes`.
+
+        Parameters
+        ----------
+        key : tuple or None
+            Key of the image, see :meth:`getPixelCacheKey`
+        image : numpy.ndarray
+            Decoded image, a read-only copy of the image is stored
+        """
+
+        if key is None or not self.isEnabled or image.nbytes > self._maxBytes:
+            return
+
+        # Copy the image so the cache does not keep a larger array, such as the frames of a multi-frame dataset, alive
+        image = np.array(image, copy=True)
+        image.flags.writeable = False
+
+        with self._lock:
+            if key in self._images:
+                self.nbytes -= self._images.pop(key).nbytes
+
+            self._images[key] = image
+            self.nbytes += image.nbytes
+            self._evict()
+
+    def clear(self):
+        """Remove all images from the cache and reset the hit and miss counters"""
+
+        with self._lock:
+            self._images.clear()
+            self.nbytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def _evict(self):
+        # Remove the least recently used images until the cache is within its size, the lock must be held
+        while self._images and self.nbytes > self._maxBytes:
+            _, image = self._images.popitem(last=False)
+            self.nbytes -= image.nbytes
+
+    def __contains__(self, key):
+        return key in self._images
+
+    def __len__(self):
+        return len(self._images)
+
+    def __str__(self):
+        return 'PixelCache(images=%i, nbytes=%i, maxBytes=%i, hits=%i, misses=%i)' % \
+               (len(self), self.nbytes, self._maxBytes, self.hits, self.misses)
+
+    def __repr__(self):
+        return self.__str__()
+
+
+def getPixelCacheKey(dataset):
+    """Retrieve the key of the decoded image of a dataset in the pixel cache
+
+    Parameters
+    ----------
+    dataset : pydicom.Dataset or FrameDataset
+        Dataset of the image
+
+    Returns
+    -------
+    tuple(str, int) or None
+        SOP instance UID of the dataset and the frame index, which is None if the dataset is not a frame of a
+        multi-frame dataset. None is returned if the dataset has no SOP instance UID or the cache is disabled
+    """
+
+    if not pixelCache.isEnabled:
+        return None
+
+    if isinstance(dataset, FrameDataset):
+        UID = dataset.parent.get('SOPInstanceUID')
+        return None if UID is None else (str(UID), dataset.sliceIndex)
+    else:
+        UID = dataset.get('SOPInstanceUID')
+        return None if UID is None else (str(UID), None)
+
+
+# Pixel cache shared by the entire process
+pixelCache = PixelCache()
@@ -0,0 +1,291 @@
+import numpy as np
+from pydicom.dataset import Dataset
+from pydicom.encaps import encapsulate, generate_pixel_data_frame
+from pydicom.pixel_data_handlers.util import pixel_dtype
+
+# Tag of the number of frames element
+NUMBER_OF_FRAMES_TAG = 0x00280008
+
+# Attributes of a dataset that are needed to decode the pixel data, including reading the pixel data if it was deferred
+DECODE_ATTRIBUTES = ['file_meta', 'is_little_endian', 'is_implicit_VR', 'filename', 'fileobj_type', 'timestamp']
+
+
+def getImageShape(dataset):
+    """Retrieve the shape of the image(s) in a dataset from the DICOM header without decoding the pixel data
+
+    Parameters
+    ----------
+    dataset : pydicom.Dataset
+
+    Returns
+    -------
+    tuple(int)
+        Shape of a single image which is (rows, columns) or (rows, columns, samples) for images with more than one
+        sample per pixel
+    """
+
+    samplesPerPixel = dataset.get('SamplesPerPixel', 1)
+
+    if samplesPerPixel > 1:
+        return dataset.Rows, dataset.Columns, samplesPerPixel
+    else:
+        return dataset.Rows, dataset.Columns
+
+
+def getRescaleRange(dataset, slopes, intercepts):
+    """Find the range of the stored and rescaled values of a series
+
+    The range of stored values is determined from Bits Stored and Pixel Representation. The range includes the stored
+    values as well as the rescaled values since the volume holds the stored values before it is rescaled in place.
+
+    Parameters
+    ----------
+    dataset : pydicom.Dataset
+        Dataset containing the pixel data description, for multi-frame data this is the parent dataset
+    slopes : numpy.ndarray
+        Rescale slope of each image
+    intercepts : numpy.ndarray
+        Rescale intercept of each image
+
+    Returns
+    -------
+    tuple(float, float, bool)
+        Minimum and maximum value and whether every slope and intercept is an integer, in which case the rescaled values
+        are integers as well
+    """
+
+    bitsStored = int(dataset.get('BitsStored', dataset.get('BitsAllocated', 16)))
+
+    if dataset.get('PixelRepresentation', 0) == 1:
+        minimum, maximum = -2 ** (bitsStored - 1), 2 ** (bitsStored - 1) - 1
+    else:
+        minimum, maximum = 0, 2 ** bitsStored - 1
+
+    isInteger = bool(np.all(np.mod(slopes, 1) == 0) and np.all(np.mod(intercepts, 1) == 0))
+
+    # Range of values before and after rescaling, a negative slope swaps the minimum and maximum
+    values = np.concatenate(([minimum, maximum], slopes * minimum + intercepts, slopes * maximum + intercepts))
+
+    return values.min(), values.max(), isInteger
+
+
+def getRescaleDtype(dataset, slopes, intercepts):
+    """Find the narrowest data type that exactly holds the stored and rescaled values of a series
+
+    The range of values is determined using :meth:`getRescaleRange`. If every slope and intercept is an integer, the
+    smallest integer type that holds both the stored values and the rescaled values is used, such as int16 for CT
+    images in Hounsfield units. Otherwise, float32 is used unless the stored values do not fit exactly in float32, in
+    which case float64 is used.
+
+    Parameters
+    ----------
+    dataset : pydicom.Dataset
+        Dataset containing the pixel data description, for multi-frame data this is the parent dataset
+    slopes : numpy.ndarray
+        Rescale slope of each image
+    intercepts : numpy.ndarray
+        Rescale intercept of each image
+
+    Returns
+    -------
+    numpy.dtype
+        Data type for the rescaled volume
+    """
+
+    minimum, maximum, isInteger = getRescaleRange(dataset, slopes, intercepts)
+
+    if not isInteger:
+        bitsStored = int(dataset.get('BitsStored', dataset.get('BitsAllocated', 16)))
+        return np.dtype(np.float32 if bitsStored <= 24 else np.float64)
+
+    for dtype in [np.uint8, np.int8, np.uint16, np.int16, np.uint32, np.int32, np.int64]:
+        if np.iinfo(dtype).min <= minimum and maximum <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+
+    return np.dtype(np.float64)
+
+
+def checkRescaleDtype(dtype, dataset, slopes, intercepts):
+    """Check that a data type holds the stored and rescaled values of a series without wrapping around
+
+    Parameters
+    ----------
+    dtype : numpy.dtype
+        Data type of the volume
+    dataset : pydicom.Dataset
+        Dataset containing the pixel data description, for multi-frame data this is the parent dataset
+    slopes : numpy.ndarray
+        Rescale slope of each image
+    intercepts : numpy.ndarray
+        Rescale intercept of each image
+
+    Raises
+    ------
+    TypeError
+        If the data type is not a numeric type, is an integer type and the rescaled values are not integers or does not
+        hold the range of the stored and rescaled values
+    """
+
+    dtype = np.dtype(dtype)
+    minimum, maximum, isInteger = getRescaleRange(dataset, slopes, intercepts)
+
+    if np.issubdtype(dtype, np.integer):
+        if not isInteger:
+            raise TypeError('Data type %s cannot hold the rescaled values since the rescale slope or intercept is not '
+                            'an integer' % dtype)
+
+        info = np.iinfo(dtype)
+    elif np.issubdtype(dtype, np.floating):
+        info = np.finfo(dtype)
+    else:
+        raise TypeError('Data type %s cannot hold the rescaled values' % dtype)
+
+    if minimum < info.min or maximum > info.max:
+        raise TypeError('Data type %s cannot hold the stored and rescaled values in the range [%g, %g]' %
+                        (dtype, minimum, maximum))
+
+
+def readPixelArray(dataset):
+    """Decode the pixel data of a dataset without keeping the pixel data or decoded array in the dataset
+
+    Accessing :attr:`pydicom.Dataset.pixel_array` stores the decoded array in the dataset and, if the pixel data was
+    deferred when reading the file, the raw pixel data as well. When combining a series, this means every image would
+    be kept in memory twice. Instead, the pixel data is decoded using a temporary dataset that shares the data elements
+    with the original, so the original dataset is left untouched and deferred pixel data stays deferred.
+
+    For a :class:`HeaderDataset`, the pixel data is read from its location in the file.
+
+    Parameters
+    ----------
+    dataset : pydicom.Dataset
+
+    Returns
+    -------
+    numpy.ndarray
+        Decoded pixel data
+    """
+
+    return getDecodeDataset(dataset).pixel_array
+
+
+def getDecodeDataset(dataset):
+    """Create a temporary dataset for decoding the pixel data of a dataset, see :meth:`readPixelArray`
+
+    Data elements that are replaced in the temporary dataset using :meth:`pydicom.Dataset.add_new` do not change the
+    original dataset.
+
+    Parameters
+    ----------
+    dataset : pydicom.Dataset
+
+    Returns
+    -------
+    pydicom.Dataset
+        Temporary dataset sharing the data elements of the dataset, including the pixel data
+    """
+
+    temporary = Dataset(dict(dataset.items()))
+
+    for attribute in DECODE_ATTRIBUTES:
+        if hasattr(dataset, attribute):
+            setattr(temporary, attribute, getattr(dataset, attribute))
+
+    if isinstance(dataset, HeaderDataset):
+        temporary.add_new(PIXEL_DATA_TAG, dataset.pixelDataVR, dataset.readPixelData())
+
+    return temporary
+
+
+def getPixelDtype(dataset):
+    """Retrieve the data type of the decoded pixel data from the DICOM header without decoding it
+
+    Parameters
+    ----------
+    dataset : pydicom.Dataset
+
+    Returns
+    -------
+    numpy.dtype
+        Data type of the decoded pixel data in native byte order
+    """
+
+    return pixel_dtype(dataset).newbyteorder('=')
+
+
+def getFrames(dataset):
+    """Retrieve the decoded frames of a multi-frame dataset
+
+    Parameters
+    ----------
+    dataset : pydicom.Dataset
+        Multi-frame dataset
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of frames where the first dimension is the frame index, even if there is only one frame
+    """
+
+    frames = readPixelArray(dataset)
+
+    # pydicom does not include the frame dimension if there is only one frame
+    if int(dataset.get('NumberOfFrames', 1)) == 1:
+        frames = frames[None]
+
+    return frames
+
+
+def readFrames(dataset, frameIndices):
+    """Decode only some of the frames of a multi-frame dataset
+
+    Only the pixel data of the requested frames is decoded, which allows the frames of one multi-frame dataset to be
+    decoded by several processes at once. For encapsulated (compressed) pixel data, the fragments of the frames are
+    taken from the pixel data using the Basic Offset Table or Number of Frames. For native pixel data, the bytes of the
+    frames are taken from the pixel data. Native pixel data with fewer than 8 bits allocated is decoded entirely.
+
+    Parameters
+    ----------
+    dataset : pydicom.Dataset
+        Multi-frame dataset
+    frameIndices : list(int)
+        Indices of the frames to decode
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of the frames in the order of :obj:`frameIndices` where the first dimension is the frame index
+    """
+
+    numberOfFrames = int(dataset.get('NumberOfFrames', 1))
+    uniqueIndices = sorted(set(frameIndices))
+
+    if len(uniqueIndices) == numberOfFrames:
+        return getFrames(dataset)[frameIndices]
+
+    temporary = getDecodeDataset(dataset)
+    pixelData = temporary.PixelData
+
+    if temporary.file_meta.TransferSyntaxUID.is_compressed:
+        frames = list(generate_pixel_data_frame(pixelData, numberOfFrames))
+        pixelData = encapsulate([frames[index] for index in uniqueIndices])
+    elif temporary.BitsAllocated % 8 == 0:
+        frameSize = temporary.Rows * temporary.Columns * temporary.get('SamplesPerPixel', 1) * \
+            temporary.BitsAllocated // 8
+        pixelData = b''.join(pixelData[index * frameSize:(index + 1) * frameSize] for index in uniqueIndices)
+    else:
+        return getFrames(dataset)[frameIndices]
+
+    # Replace the data elements rather than setting their values, which are shared with the original dataset
+    temporary.add_new(PIXEL_DATA_TAG, temporary[PIXEL_DATA_TAG].VR, pixelData)
+    temporary.add_new(NUMBER_OF_FRAMES_TAG, 'IS', len(uniqueIndices))
+
+    frames = temporary.pixel_array
+    if len(uniqueIndices) == 1:
+        frames = frames[None]
+
+    # Map each requested frame to its position among the decoded frames
+    positions = {index: position for position, index in enumerate(uniqueIndices)}
+    return frames[[positions[index] for index in frameIndices]]
+
+
+from .headerDataset import HeaderDataset, PIXEL_DATA_TAG
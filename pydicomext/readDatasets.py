@@ -0,0 +1,176 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+
+import pydicom
+
+from pydicomext.util import isDICOMDIRDataset, openDICOMFile
+
+# Tags that identify which patient, study and series a dataset belongs to
+IDENTIFIER_TAGS = ['PatientID', 'StudyInstanceUID', 'SeriesInstanceUID']
+
+# Maximum number of reads that are queued ahead of the datasets that have been returned when reading in parallel
+READ_WINDOW = 64
+
+
+def readDataset(filename, implicitVR=False):
+    """Read a DICOM file for loading into a directory hierarchy
+
+    Set defer_size to be 2048 bytes which means any data larger than this will not be read until it is first used in
+    code. This should primarily be the pixel data.
+
+    The start of the file is checked to be a DICOM file in the same open as the read, see :meth:`openDICOMFile`, so
+    any file found while searching a directory can be passed. DICOMDIR files are skipped as well since they do not
+    contain an image.
+
+    Parameters
+    ----------
+    filename : str
+        Filename of the DICOM file to read
+    implicitVR : bool, optional
+        See :meth:`isDICOMHeader` for more information on this parameter
+
+    Returns
+    -------
+    pydicom.Dataset or None
+        Dataset that was read, None if the file is not a DICOM file or is a DICOMDIR file
+    """
+
+    file = openDICOMFile(filename, implicitVR)
+    if file is None:
+        return None
+
+    with file:
+        dataset = pydicom.dcmread(file, defer_size=2048, force=True)
+
+    return None if isDICOMDIRDataset(dataset) else dataset
+
+
+def readIdentifiers(filename, implicitVR=False):
+    """Read only the patient ID, study instance UID and series instance UID from a DICOM file
+
+    Reading stops before the pixel data and the values of all other tags are skipped, which is much faster than
+    reading the entire header. This is used to filter files before reading them completely.
+
+    Parameters
+    ----------
+    filename : str
+        Filename of the DICOM file to read
+    implicitVR : bool, optional
+        See :meth:`isDICOMHeader` for more information on this parameter
+
+    Returns
+    -------
+    pydicom.Dataset or None
+        Dataset containing only the identifying tags, None if the file is not a DICOM file or is a DICOMDIR file
+    """
+
+    file = openDICOMFile(filename, implicitVR)
+    if file is None:
+        return None
+
+    with file:
+        dataset = pydicom.dcmread(file, stop_before_pixels=True, specific_tags=IDENTIFIER_TAGS, force=True)
+
+    return None if isDICOMDIRDataset(dataset) else dataset
+
+
+def readDatasets(filenames, workers=None, executor=None, readFunc=readDataset):
+    """Read a list of DICOM files, optionally in parallel
+
+    The datasets are always returned in the same order as the filenames regardless of the order the files are read in.
+
+    Parameters
+    ----------
+    filenames : list(str)
+        List of filenames to read
+    workers : int, optional
+        Number of threads to use for reading the files (default is None, which reads the files serially). Ignored if
+        :obj:`executor` is given.
+    executor : :class:`concurrent.futures.Executor`, optional
+        Executor used to read the files (default is None). The executor is not shut down after reading.
+    readFunc : callable, optional
+        Function that takes a filename and returns the dataset, or None if the file is not a DICOM file. This must be
+        picklable (i.e. a module-level function or a :func:`functools.partial` of one) when a process pool executor is
+        used (default is :meth:`readDataset`)
+
+    Returns
+    -------
+    iterator(pydicom.Dataset or None)
+        Iterator of the datasets in the same order as the filenames, None for files that are not DICOM files. When
+        reading in parallel, at most :obj:`READ_WINDOW` reads are queued ahead of the dataset being returned, so the
+        memory usage does not depend on the number of files
+    """
+
+    if executor is not None:
+        # Chunk the filenames so process pools are not dominated by the overhead of sending one filename at a time, the
+        # chunk size is limited to keep the number of datasets in flight small
+        chunkSize = min(max(1, len(filenames) // READ_WINDOW), 16)
+        return iterReadDatasets(filenames, executor, readFunc, chunkSize)
+    elif workers is not None and workers > 1:
+        return iterReadDatasetsThreaded(filenames, workers, readFunc)
+    else:
+        return map(readFunc, filenames)
+
+
+def iterReadDatasets(filenames, executor, readFunc, chunkSize=1):
+    """Read a list of DICOM files using an executor, keeping a bounded number of reads queued
+
+    Unlike :meth:`concurrent.futures.Executor.map`, which submits every read at once and keeps every dataset until it
+    is retrieved, only :obj:`READ_WINDOW` chunks of files are submitted ahead of the datasets that have been returned.
+
+    Parameters
+    ----------
+    filenames : iterable(str)
+        Filenames to read, these are only retrieved as the reads are submitted
+    executor : :class:`concurrent.futures.Executor`
+        Executor used to read the files
+    readFunc : callable
+        See :meth:`readDatasets` for more information on this parameter
+    chunkSize : int, optional
+        Number of files read by each task (default is 1)
+
+    Returns
+    -------
+    iterator(pydicom.Dataset)
+        Iterator of the datasets in the same order as the filenames
+    """
+
+    filenames = iter(filenames)
+    chunks = iter(lambda: list(itertools.islice(filenames, chunkSize)), [])
+    pending = deque()
+
+    for chunk in chunks:
+        pending.append(executor.submit(readChunk, chunk, readFunc))
+
+        if len(pending) >= READ_WINDOW:
+            yield from pending.popleft().result()
+
+    while pending:
+        yield from pending.popleft().result()
+
+
+def iterReadDatasetsThreaded(filenames, workers, readFunc):
+    """Read a list of DICOM files using a thread pool that is shut down once all files are read
+
+    See :meth:`iterReadDatasets` for more information on the parameters.
+    """
+
+    with ThreadPoolExecutor(workers) as executor:
+        yield from iterReadDatasets(filenames, executor, readFunc)
+
+
+def readChunk(filenames, readFunc):
+    """Read a chunk of DICOM files, this is run by an executor so it must be a module-level function
+
+    Parameters
+    ----------
+    filenames : list(str)
+    readFunc : callable
+
+    Returns
+    -------
+    list(pydicom.Dataset)
+    """
+
+    return [readFunc(filename) for filename in filenames]
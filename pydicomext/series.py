@@ -1,7 +1,18 @@
+from collections import OrderedDict
+
+from pydicomext.deferredDataset import DeferredDataset
+from pydicomext.frameDataset import FrameDataset
+from pydicomext.metadata import SeriesMetadata
+from pydicomext.readDatasets import readDatasets
 from pydicomext.util import *
 
 
 class Series(list):
+    # DicomDir, Patient, Study and Series use slots rather than a per-instance dictionary to reduce memory usage when
+    # loading large archives
+    __slots__ = ('ID', 'date', 'time', 'description', 'number', '_isMultiFrame', '_isDeferred', '_shape', '_spacing',
+                 '_methods', '_metadata', '_methodSummary', '_parents', '_sortCache')
+
     def __init__(self, datasets=None, dataset=None):
         if dataset:
             self.ID = dataset.get('SeriesInstanceUID')
@@ -19,11 +30,22 @@ class Series(list):
         # Stores whether we have multi frame data and whether we have only multi frame data
         self._isMultiFrame = False
 
+        # Stores whether the series contains deferred datasets that have not been loaded yet, see loadDeferred
+        self._isDeferred = False
+
         # Stores sort information if this series is ever sorted
         self._shape = None
         self._spacing = None
         self._methods = None
 
+        # Cached information about the datasets in the series, cleared whenever the series is modified
+        self._metadata = None
+        self._methodSummary = None
+        self._parents = None
+
+        # Results of sorting the series keyed by the sort parameters, see sortSeries
+        self._sortCache = {}
+
         list.__init__(self)
 
         # Add items to the list
@@ -36,30 +58,85 @@ class Series(list):
         This function should not be called unless you know what you are doing.
 
         This should only be called once after the DICOM file has been loaded.
+
+        Each multi-frame dataset is replaced by a :class:`FrameDataset` for each of its frames, which are placed after
+        all of the other datasets. The frame datasets do not retrieve their item from the Per-frame Functional Groups
+        Sequence until they are accessed.
         """
 
-        # Reset to original value
-        self._isMultiFrame = False
+        datasets = []
+        frameDatasets = []
+        parents = []
 
         for dataset in self:
             # Use NumberOfFrames as indicator of whether the dataset is multi-frame or not
             # If this is present, we **assume** that Per-frame Functional Groups Sequence is present
             if 'NumberOfFrames' not in dataset:
+                datasets.append(dataset)
                 continue
 
-            # The first instance of a multiframe series sets this true
-            self._isMultiFrame = True
+            # Create a frame dataset for each frame, the parent dataset itself is not kept in the list
+            parents.append(dataset)
+            frameDatasets.extend(FrameDataset(dataset, x) for x in range(int(dataset.NumberOfFrames)))
+
+        # The first instance of a multiframe series sets this true
+        self._isMultiFrame = len(parents) > 0
+
+        if parents:
+            self[:] = datasets + frameDatasets
+            self._parents = parents
+
+    def loadDeferred(self, workers=None, executor=None):
+        """Read any deferred datasets in the series and load multiframe data
+
+        A series built without reading its DICOM files, such as from a DICOMDIR file, contains a
+        :class:`DeferredDataset` for each file. The files are read and the deferred datasets are replaced by the
+        datasets that were read, followed by :meth:`loadMultiFrame`. Until this is called, the series contains one
+        dataset per file even if some of the files are multi-frame. Any file that turns out not to be a DICOM file is
+        removed from the series with a warning.
+
+        This is called automatically when the series is sorted or combined, or when :attr:`isMultiFrame`,
+        :attr:`metadata` or :attr:`parents` is accessed. Nothing is done if the series is not deferred. Call this
+        explicitly with :obj:`workers` or :obj:`executor` to read the files in parallel, :meth:`combineSeries` does
+        this with its own :obj:`workers` and :obj:`executor`.
+
+        Parameters
+        ----------
+        workers : int, optional
+            See :meth:`readDatasets` for more information on this parameter
+        executor : :class:`concurrent.futures.Executor`, optional
+            See :meth:`readDatasets` for more information on this parameter
+        """
+
+        if not self._isDeferred:
+            return
+
+        # Group the deferred datasets by their read function so that each group is read with one call
+        deferredDatasets = OrderedDict()
+        for dataset in self:
+            if isinstance(dataset, DeferredDataset) and not dataset.isLoaded:
+                deferredDatasets.setdefault(dataset.readFunc, []).append(dataset)
+
+        for readFunc, datasets in deferredDatasets.items():
+            filenames = [dataset.filename for dataset in datasets]
+
+            for deferredDataset, dataset in zip(datasets, readDatasets(filenames, workers, executor, readFunc)):
+                deferredDataset._dataset = dataset
+
+        datasets = []
+        for dataset in self:
+            if isinstance(dataset, DeferredDataset):
+                if not dataset.isLoaded:
+                    logger.warning('Removing %s from the series, it is not a DICOM file' % dataset.filename)
+                    continue
 
-            # Loop through each frame dataset and save to list
-            for x, frameDataset in enumerate(dataset.PerFrameFunctionalGroupsSequence):
-                # Append pointer to parent dataset and slice index
-                frameDataset.parent = dataset
-                frameDataset.sliceIndex = x
+                dataset = dataset.load()
 
-                self.append(frameDataset)
+            datasets.append(dataset)
 
-            # Save the parent dataset and remove from list
-            self.remove(dataset)
+        self._isDeferred = False
+        self[:] = datasets
+        self.loadMultiFrame()
 
     def checkIsMultiFrame(self):
         """Check if this series is multiframe or not
@@ -69,15 +146,131 @@ class Series(list):
         This value is cached.
         """
 
-        # Check all datasets for the parent attribute, if any are present, then we have multiframe data
-        self._isMultiFrame = any([hasattr(dataset, 'parent') and dataset.parent is not None for dataset in self])
+        # Check for any frame datasets, if any are present, then we have multiframe data
+        self._isMultiFrame = any(isinstance(dataset, FrameDataset) for dataset in self)
+
+        # Cached information depends on whether the series is multiframe
+        self._resetCache()
+
+    def clearCache(self):
+        """Clear cached information about the datasets in the series
+
+        Information such as the metadata table, which methods are valid for sorting and the results of previous sorts is
+        cached in the series. This is automatically cleared when datasets are added or removed from the series, but must
+        be called manually if the datasets themselves are modified.
+
+        The metadata table of each frame of a multi-frame dataset is cached in the dataset itself, see
+        :meth:`getFrameMetadata`, and is removed as well.
+        """
+
+        for dataset in self:
+            if isinstance(dataset, FrameDataset):
+                dataset.parent.__dict__.pop('_frameMetadata', None)
+
+        self._resetCache()
+
+    def _resetCache(self):
+        # Adding or removing datasets does not modify the datasets themselves, so the frame metadata cached in the
+        # multi-frame datasets is kept
+        self._metadata = None
+        self._methodSummary = None
+        self._parents = None
+        self._sortCache = {}
+
+    @property
+    def parents(self):
+        """List of the multi-frame datasets that the frames in the series belong to
+
+        The parents are in the order of their first frame in the series. The list is empty if the series is not
+        multi-frame.
+        """
+
+        self.loadDeferred()
+
+        if self._parents is None:
+            parents = {}
+            for dataset in self:
+                if isinstance(dataset, FrameDataset):
+                    parents.setdefault(id(dataset.parent), dataset.parent)
+
+            self._parents = list(parents.values())
+
+        return self._parents
+
+    @property
+    def metadata(self):
+        """Table of metadata for each dataset in the series
+
+        See :class:`SeriesMetadata` for the available columns. The table is created when first accessed and cached
+        until the series is modified.
+        """
+
+        self.loadDeferred()
+
+        if self._metadata is None:
+            self._metadata = SeriesMetadata(self)
+
+        return self._metadata
+
+    # Any operation that modifies the list of datasets clears the cached information
+    def append(self, dataset):
+        self._resetCache()
+        list.append(self, dataset)
+
+    def extend(self, datasets):
+        self._resetCache()
+        list.extend(self, datasets)
+
+    def insert(self, index, dataset):
+        self._resetCache()
+        list.insert(self, index, dataset)
+
+    def remove(self, dataset):
+        self._resetCache()
+        list.remove(self, dataset)
+
+    def pop(self, index=-1):
+        self._resetCache()
+        return list.pop(self, index)
+
+    def clear(self):
+        self._resetCache()
+        list.clear(self)
+
+    def reverse(self):
+        self._resetCache()
+        list.reverse(self)
+
+    def __setitem__(self, index, value):
+        self._resetCache()
+        list.__setitem__(self, index, value)
+
+    def __delitem__(self, index):
+        self._resetCache()
+        list.__delitem__(self, index)
+
+    def __iadd__(self, datasets):
+        self._resetCache()
+        return list.__iadd__(self, datasets)
+
+    def __imul__(self, count):
+        self._resetCache()
+        return list.__imul__(self, count)
 
     @property
     def isMultiFrame(self):
         """Whether or not this series is multiframe"""
 
+        self.loadDeferred()
+
         return self._isMultiFrame
 
+    @property
+    def isDeferred(self):
+        """Whether the series contains deferred datasets that have not been loaded yet, see :meth:`loadDeferred`"""
+
+        return self._isDeferred
+
     @property
     def shape(self):
         """Shape of the volume excluding the 2D image size
@@ -166,18 +359,21 @@ class Series(list):
         if ID is None:
             return
 
-        multiFrameParents = []
+        # The datasets themselves are modified, so any deferred datasets must be read first
+        self.loadDeferred()
+
+        multiFrameParents = set()
 
         for dataset in self[startNewIndex:]:
             # Check for multiframe datasets, will update the parent dataset
-            if hasattr(dataset, 'parent'):
+            if isinstance(dataset, FrameDataset):
                 # If we have already handled this multiframe parent, then skip
-                if dataset.parent in multiFrameParents:
+                if id(dataset.parent) in multiFrameParents:
                     continue
 
-                # Otherwise, set dataset to be the parent and append to list so we dont do this again
+                # Otherwise, set dataset to be the parent and add to set so we dont do this again
                 dataset = dataset.parent
-                multiFrameParents.append(dataset)
+                multiFrameParents.add(id(dataset))
 
             # Update fields in dataset, remove optional ones if value is None
             dataset.SeriesInstanceUID = ID
@@ -340,28 +536,12 @@ class Series(list):
             Returns slice thickness
         """
 
-        # Empty lists for the thickness and slice spacings for each series
-        imageSliceSpacings = []
-        imageThicknesses = []
-
-        # Retrieve the slice spacing and slice thickness for each series
-        # Note: This information is located in different spots if the image is multi-frame
-        # If the slice thickness or spacing is not available in that series, then it will be set to -1
-        # This should allow the user to tell if there is missing data because a negative thickness or spacing is invalid
-        if self.isMultiFrame:
-            for dataset in self:
-                if 'SpacingBetweenSlices' in dataset.PixelMeasuresSequence[0]:
-                    imageSliceSpacings.append(dataset.PixelMeasuresSequence[0].SpacingBetweenSlices)
-
-                if 'SliceThickness' in dataset.PixelMeasuresSequence[0]:
-                    imageThicknesses.append(dataset.PixelMeasuresSequence[0].SliceThickness)
-        else:
-            for dataset in self:
-                if 'SpacingBetweenSlices' in dataset:
-                    imageSliceSpacings.append(dataset.SpacingBetweenSlices)
-
-                if 'SliceThickness' in dataset:
-                    imageThicknesses.append(dataset.SliceThickness)
+        # Retrieve the slice spacing and slice thickness for each series from the metadata table
+        # Note: This information is located in different spots if the image is multi-frame, which is handled by the
+        # metadata table
+        # Missing values are removed so the user can tell if there is missing data by the length of the arrays
+        imageSliceSpacings = self.metadata.spacingBetweenSlices[~np.isnan(self.metadata.spacingBetweenSlices)]
+        imageThicknesses = self.metadata.sliceThicknesses[~np.isnan(self.metadata.sliceThicknesses)]
 
         # Check slice spacings to make sure they are the same, otherwise throw warning/error
         # Any missing values are caught by checking the length of the array to the number of datasets
@@ -386,25 +566,26 @@ class Series(list):
                 raise Exception('Datasets SliceThickness are not similar or some datasets are missing values')
 
         if spacingOrThickness:
-            if imageSliceSpacings:
+            if len(imageSliceSpacings) > 0:
                 return imageSliceSpacings[0]
-            elif imageThicknesses:
+            elif len(imageThicknesses) > 0:
                 return imageThicknesses[0]
             else:
                 return None
         elif thicknessOrSpacing:
-            if imageThicknesses:
+            if len(imageThicknesses) > 0:
                 return imageThicknesses[0]
-            elif imageSliceSpacings:
+            elif len(imageSliceSpacings) > 0:
                 return imageSliceSpacings[0]
             else:
                 return None
         else:
-            return (imageSliceSpacings[0] if imageSliceSpacings else None,
-                    imageThicknesses[0] if imageThicknesses else None)
+            return (imageSliceSpacings[0] if len(imageSliceSpacings) > 0 else None,
+                    imageThicknesses[0] if len(imageThicknesses) > 0 else None)
 
     def combine(self, methods=MethodType.Unknown, reverse=False, squeeze=False, warn=True, shapeTolerance=0.01,
-                spacingTolerance=0.1):
+                spacingTolerance=0.1, out=None, filename=None, lazy=False, rescale=False, dtype=None, workers=None,
+                executor=None):
         """Combines series into an N-D Numpy array and returns some information about the volume
 
         Many of the parameters are from the :meth:`sort` function which this function will call unless the series has
@@ -449,15 +630,39 @@ class Series(list):
         spacingTolerance : float, optional
             See :meth:`sortSeries` for more information on this parameter. Only used if the series has **not** been
             sorted yet.
+        out : numpy.ndarray, optional
+            See :meth:`combineSeries` for more information on this parameter.
+        filename : str, optional
+            See :meth:`combineSeries` for more information on this parameter.
+        lazy : bool, optional
+            See :meth:`combineSeries` for more information on this parameter.
+        rescale : bool, optional
+            See :meth:`combineSeries` for more information on this parameter.
+        dtype : numpy.dtype, optional
+            See :meth:`combineSeries` for more information on this parameter.
+        workers : int, optional
+            See :meth:`combineSeries` for more information on this parameter.
+        executor : :class:`concurrent.futures.Executor`, optional
+            See :meth:`combineSeries` for more information on this parameter.
 
         Raises
         ------
         TypeError
             If the series is empty
+        TypeError
+            If :obj:`out` does not have the shape of the volume, more than one of :obj:`out`, :obj:`filename` and
+            :obj:`lazy` are given or :obj:`lazy` is given with :obj:`rescale` or :obj:`dtype`
+        TypeError
+            If :obj:`rescale` is set and :obj:`dtype`, or the data type of :obj:`out`, cannot hold the stored and
+            rescaled values
         Exception
             If datasets do not have the same image shape
         Exception
-            If datasets do not have uniform image spacing or orientation
+            If datasets do not have uniform image spacing or orientation, or have gaps between slices, and :obj:`warn`
+            is False
+        Exception
+            If datasets have a gantry tilt of more than 0.1 degrees within a stack and :obj:`warn` is False, see
+            :meth:`combineSeries`
 
         Returns
         -------
@@ -465,7 +670,8 @@ class Series(list):
             Volume that contains Numpy array, origin, spacing and other relevant information
         """
 
-        return combineSeries(self, methods, reverse, squeeze, warn, shapeTolerance, spacingTolerance)
+        return combineSeries(self, methods, reverse, squeeze, warn, shapeTolerance, spacingTolerance, out, filename,
+                             lazy, rescale, dtype, workers, executor)
 
     def __str__(self):
         return """Series %s
@@ -474,7 +680,7 @@ class Series(list):
     Desc: %s
     Number: %s
     [%i datasets]%s""" % (self.ID, self.date, self.time, self.description, self.number, len(self),
-                          (' (Multi-frame)' if self.isMultiFrame else ''))
+                          (' (Deferred)' if self._isDeferred else ' (Multi-frame)' if self._isMultiFrame else ''))
 
     def __repr__(self):
         return self.__str__()
@@ -1,3 +1,4 @@
+import numpy as np
 import pydicom
 
 from pydicomext.util import *
@@ -13,6 +14,10 @@ def sortSeries(series, methods=MethodType.Unknown, reverse=False, squeeze=False,
     Sorting the datasets within the series can be done based on a number of parameters, which are primarily going to be
     spatial or temporal based.
 
+    The result of the sort is cached in the series, so sorting the series again with the same parameters only reorders
+    the datasets rather than sorting them again. Any warnings are only given the first time. The cache is cleared when
+    the series is modified, see :meth:`Series.clearCache`.
+
     Parameters
     ----------
     series : Series
@@ -60,6 +65,12 @@ def sortSeries(series, methods=MethodType.Unknown, reverse=False, squeeze=False,
     if len(series) == 0:
         raise TypeError('Series must contain at least one dataset')
 
+    # Reuse the result of a previous sort with the same parameters
+    cacheKey = (tuple(methods) if isinstance(methods, list) else methods, reverse, squeeze, warn, shapeTolerance,
+                spacingTolerance)
+    if cacheKey in series._sortCache:
+        return createSortedSeries(series, *series._sortCache[cacheKey])
+
     if methods == MethodType.Unknown:
         methods = getBestMethods(series)
 
@@ -67,63 +78,21 @@ def sortSeries(series, methods=MethodType.Unknown, reverse=False, squeeze=False,
     if not isinstance(methods, list):
         methods = [methods]
 
-    # This list will contain additional lists/iterators that are the keys to sort the series by
-    keys = []
-
-    # Loop through all of the methods and add the key values to the keyAttrs list
+    # Check all of the specified methods for any invalid ones
     for method in methods:
-        # Check all of the specified methods for any invalid ones
         if not isMethodValid(series, method):
             raise TypeError('Invalid method specified: %s' % method)
 
-        if method == MethodType.SliceLocation:
-            keys.append([d.SliceLocation for d in series])
-        elif method == MethodType.PatientLocation:
-            # Get slice positions for each object
-            slicePositions = getZPositionsFromPatientInfo(series)
-
-            keys.append(slicePositions)
-        elif method == MethodType.TriggerTime:
-            keys.append([d.TriggerTime for d in series])
-        elif method == MethodType.AcquisitionDateTime:
-            keys.append([d.AcquisitionDateTime.timestamp() * 1000.0 for d in series])
-        elif method == MethodType.ImageNumber:
-            keys.append([d.InstanceNumber for d in series])
-        elif method == MethodType.StackID:
-            keys.append([int(d.FrameContentSequence[0].StackID) for d in series])
-        elif method == MethodType.StackPosition:
-            keys.append([d.FrameContentSequence[0].InStackPositionNumber for d in series])
-        elif method == MethodType.TemporalPositionIndex:
-            keys.append([d.FrameContentSequence[0].TemporalPositionIndex for d in series])
-        elif method == MethodType.FrameAcquisitionNumber:
-            keys.append([d.FrameContentSequence[0].FrameAcquisitionNumber for d in series])
-        elif method == MethodType.MFPatientLocation:
-            # Get slice positions for each object
-            slicePositions = getZPositionsFromPatientInfo(series)
-
-            keys.append(slicePositions)
-        elif method == MethodType.MFAcquisitionDateTime:
-            keys.append([d.FrameContentSequence[0].FrameAcquisitionDateTime.timestamp() * 1000.0 for d in series])
-        elif method == MethodType.CardiacTriggerTime:
-            keys.append([d.CardiacSynchronizationSequence[0].NominalCardiacTriggerDelayTime for d in series])
-        elif method == MethodType.CardiacPercentage:
-            keys.append([d.CardiacSynchronizationSequence[0].NominalPercentageOfCardiacPhase for d in series])
-
-    # Append the actual series to the end of the list so they are sorted as well
-    keys.append(series)
-
-    # Lots is happening here, but let me break it up one by one
-    # Zip up the keyAttrs so that each iterator in the list will be: (key1, key2, key3, ..., series)
-    # Then sort that list which will sort based on key1, then key2, etc (but do NOT use dataset as sorting key!)
-    # Next we unzip the list (by zipping it again) so that each list is the entire list of keys for that method
-    sortedKeys = list(zip(*sorted(zip(*keys), key=lambda x: x[:-1], reverse=reverse)))
-
-    # Sorted series is the last element and the remaining items are the keys used for sorting
-    # Wrap the sorted series back into Series class because it is a tuple
-    sortedSeries, sortedKeys = Series(sortedKeys[-1]), sortedKeys[:-1]
+    # Retrieve the keys to sort by as a 2D array where each row contains the keys for one method
+    keys = getSortKeys(series, methods)
 
-    # Update to determine if series is multiframe
-    sortedSeries.checkIsMultiFrame()
+    # Sort the datasets by the first method, then the second method, etc. np.lexsort uses the last key as the primary
+    # key so the keys are reversed. The sort is stable, so negating the keys gives a descending sort that keeps datasets
+    # with equal keys in their original order, the same as a reverse sort in Python
+    order = np.lexsort(-keys[::-1] if reverse else keys[::-1])
+
+    # Sort the keys in the same order as the datasets
+    sortedKeys = keys[:, order]
 
     # From the sorted keys, get the shape of the ND data and spacing
     shape, spacing = getSpacingDims(sortedKeys, warn, shapeTolerance, spacingTolerance)
@@ -139,11 +108,72 @@ def sortSeries(series, methods=MethodType.Unknown, reverse=False, squeeze=False,
         # Convert shape and spacing to a tuple, better for passing around, should not be mutable
         shape, spacing = tuple(shape), tuple(spacing)
 
+    # Copy the methods list since it may be the list given by the caller
+    series._sortCache[cacheKey] = (order, shape, spacing, list(methods) if isinstance(methods, list) else methods)
+
+    return createSortedSeries(series, order, shape, spacing, methods)
+
+
+def createSortedSeries(series, order, shape, spacing, methods):
+    """Create a sorted series from the datasets of a series in the sorted order
+
+    Parameters
+    ----------
+    series : Series
+        Series that was sorted
+    order : numpy.ndarray
+        Indices of the datasets of :obj:`series` in the sorted order
+    shape : tuple(int)
+        Shape of the sorted series
+    spacing : tuple(float)
+        Spacing of each dimension of the sorted series
+    methods : list(MethodType) or tuple(MethodType)
+        Methods that the series was sorted by
+
+    Returns
+    -------
+    Series
+        Series that has been sorted
+    """
+
+    sortedSeries = Series([series[index] for index in order])
+
+    # Update to determine if series is multiframe
+    sortedSeries.checkIsMultiFrame()
+
+    # The metadata table of the sorted series is the same as the original series in the sorted order
+    sortedSeries._metadata = series.metadata.take(order)
+
     # Update the metadata in the series itself
+    # The methods are copied so that modifying the methods of one sorted series does not affect the others
     sortedSeries._shape = shape
     sortedSeries._spacing = spacing
-    sortedSeries._methods = methods
+    sortedSeries._methods = list(methods) if isinstance(methods, list) else methods
 
     # Return methods as well because the user may have set the method type to unknown to retrieve best method type, so
     # they would want to know the results
     return sortedSeries
+
+
+def getSortKeys(series, methods):
+    """Retrieve the keys to sort a series by for each method
+
+    The keys are taken from the method summary of the series, see :meth:`getMethodSummary`, so the series is not
+    traversed again.
+
+    Parameters
+    ----------
+    series : Series
+    methods : list(MethodType)
+        List of methods to retrieve keys for, these should be checked that they are valid beforehand
+
+    Returns
+    -------
+    numpy.ndarray
+        2D array of shape (M, N) where M is the number of methods and N is the number of datasets in the series. Each
+        row contains the keys for the corresponding method
+    """
+
+    summary = getMethodSummary(series)
+
+    return np.array([summary[method].values for method in methods], dtype=float).reshape(len(methods), len(series))
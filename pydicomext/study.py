@@ -4,6 +4,8 @@ from pydicomext.series import Series
 
 
 class Study(dict):
+    __slots__ = ('ID', 'date', 'time', 'description')
+
     def __init__(self, dataset=None):
         if dataset:
             self.ID = dataset.get('StudyInstanceUID')
@@ -1,9 +1,16 @@
+from collections import namedtuple
 from enum import IntFlag, Enum, auto
 import logging
+import struct
 import numpy as np
 
+from pydicomext.geometry import getZPositions, isOrientationUniform
+
 logger = logging.getLogger(__name__)
 
+# Media Storage SOP Class UID of DICOMDIR files, these are skipped when reading regardless of their filename
+MEDIA_STORAGE_DIRECTORY_UID = '1.2.840.10008.1.3.10'
+
 
 class VolumeType(IntFlag):
     Unknown = 0
@@ -41,7 +48,8 @@ def isMethodValid(series, method):
     """Determines if a method is valid for a particular series
 
     Checks if a given method is available for sorting or combining a series. This checks the DICOM header of each
-    dataset in the series for the specified tag based on the method given.
+    dataset in the series for the specified tag based on the method given. The result comes from the summary of the
+    series, see :meth:`getMethodSummary`, so the series is only checked once for all methods.
 
     Parameters
     ----------
@@ -71,47 +79,13 @@ def isMethodValid(series, method):
     if method.isMultiFrame != series.isMultiFrame:
         return False
 
-    if method == MethodType.SliceLocation:
-        return all(['SliceLocation' in d for d in series])
-    elif method == MethodType.PatientLocation:
-        # Retrieve image orientation from first dataset (will return None if not present)
-        imageOrientation = series[0].get('ImageOrientationPatient')
-
-        return all(['ImageOrientationPatient' in d and 'ImagePositionPatient' in d and
-                    d.ImageOrientationPatient == imageOrientation for d in series])
-    elif method == MethodType.TriggerTime:
-        return all(['TriggerTime' in d for d in series])
-    elif method == MethodType.AcquisitionDateTime:
-        return all(['AcquisitionDateTime' in d for d in series])
-    elif method == MethodType.ImageNumber:
-        return all(['InstanceNumber' in d for d in series])
-    elif method == MethodType.StackID:
-        return all(['StackID' in d.FrameContentSequence[0] and d.FrameContentSequence[0].StackID.isdigit()
-                    for d in series])
-    elif method == MethodType.StackPosition:
-        return all(['InStackPositionNumber' in d.FrameContentSequence[0] for d in series])
-    elif method == MethodType.TemporalPositionIndex:
-        return all(['TemporalPositionIndex' in d.FrameContentSequence[0] for d in series])
-    elif method == MethodType.FrameAcquisitionNumber:
-        return all(['FrameAcquisitionNumber' in d.FrameContentSequence[0] for d in series])
-    elif method == MethodType.MFPatientLocation:
-        # Retrieve image orientation from first dataset (will return None if not present)
-        imageOrientation = series[0].PlaneOrientationSequence[0].get('ImageOrientationPatient')
-
-        return all(['ImageOrientationPatient' in d.PlaneOrientationSequence[0] and
-                    d.PlaneOrientationSequence[0].ImageOrientationPatient == imageOrientation and
-                    'ImagePositionPatient' in d.PlanePositionSequence[0] for d in series])
-    elif method == MethodType.MFAcquisitionDateTime:
-        return all(['FrameAcquisitionDateTime' in d.FrameContentSequence[0] for d in series])
-    elif method == MethodType.CardiacTriggerTime:
-        return all(['CardiacSynchronizationSequence' in d and
-                    'NominalCardiacTriggerDelayTime' in d.CardiacSynchronizationSequence[0] for d in series])
-    elif method == MethodType.CardiacPercentage:
-        return all(['CardiacSynchronizationSequence' in d and
-                    'NominalPercentageOfCardiacPhase' in d.CardiacSynchronizationSequence[0] for d in series])
-    else:
+    summary = getMethodSummary(series)
+
+    if method not in summary:
         raise TypeError('Invalid method specified')
 
+    return summary[method].valid
+
 
 def getTypeFromMethods(methods):
     """Retrieve the volume type based on the methods used for sorting
@@ -172,63 +146,50 @@ def getBestMethods(series):
 
     methods = []
 
+    # Summary of which methods are valid and whether their values vary throughout the series
+    # A method is only useful if it is valid and varies, otherwise all datasets would have the same key
+    summary = getMethodSummary(series)
+
+    def isUseful(method):
+        return summary[method].valid and summary[method].varies
+
     if series.isMultiFrame:
         # Check for stack ID
-        if isMethodValid(series, MethodType.StackID) and \
-                any([series[0].FrameContentSequence[0].StackID != d.FrameContentSequence[0].StackID for d in series]):
+        if isUseful(MethodType.StackID):
             methods.append(MethodType.StackID)
 
         # Check for stack position, patient location or frame acquisition number
-        if isMethodValid(series, MethodType.MFPatientLocation) and \
-                any([series[0].PlanePositionSequence[0].ImagePositionPatient !=
-                     d.PlanePositionSequence[0].ImagePositionPatient for d in series]):
+        if isUseful(MethodType.MFPatientLocation):
             methods.append(MethodType.MFPatientLocation)
-        elif isMethodValid(series, MethodType.StackPosition) and \
-                any([series[0].FrameContentSequence[0].InStackPositionNumber !=
-                     d.FrameContentSequence[0].InStackPositionNumber for d in series]):
+        elif isUseful(MethodType.StackPosition):
             methods.append(MethodType.StackPosition)
-        elif isMethodValid(series, MethodType.FrameAcquisitionNumber) and \
-                any([series[0].FrameContentSequence[0].FrameAcquisitionNumber !=
-                     d.FrameContentSequence[0].FrameAcquisitionNumber for d in series]):
+        elif isUseful(MethodType.FrameAcquisitionNumber):
             methods.append(MethodType.FrameAcquisitionNumber)
 
         # Check for cardiac trigger time, acquisition date time, temporal position index or cardiac percentage
-        if isMethodValid(series, MethodType.CardiacTriggerTime) and \
-                any([series[0].CardiacSynchronizationSequence[0].NominalCardiacTriggerDelayTime !=
-                     d.CardiacSynchronizationSequence[0].NominalCardiacTriggerDelayTime for d in series]):
+        if isUseful(MethodType.CardiacTriggerTime):
             methods.append(MethodType.CardiacTriggerTime)
-        elif isMethodValid(series, MethodType.MFAcquisitionDateTime) and \
-                any([series[0].FrameContentSequence[0].FrameAcquisitionDateTime !=
-                     d.FrameContentSequence[0].FrameAcquisitionDateTime for d in series]):
+        elif isUseful(MethodType.MFAcquisitionDateTime):
             methods.append(MethodType.MFAcquisitionDateTime)
-        elif isMethodValid(series, MethodType.TemporalPositionIndex) and \
-                any([series[0].FrameContentSequence[0].TemporalPositionIndex !=
-                     d.FrameContentSequence[0].TemporalPositionIndex for d in series]):
+        elif isUseful(MethodType.TemporalPositionIndex):
             methods.append(MethodType.TemporalPositionIndex)
-        elif isMethodValid(series, MethodType.CardiacPercentage) and \
-                any([series[0].CardiacSynchronizationSequence[0].NominalPercentageOfCardiacPhase !=
-                     d.CardiacSynchronizationSequence[0].NominalPercentageOfCardiacPhase for d in series]):
+        elif isUseful(MethodType.CardiacPercentage):
             methods.append(MethodType.CardiacPercentage)
     else:
         # Check for either patient location or slice location
-        if isMethodValid(series, MethodType.PatientLocation) and \
-                any([series[0].ImagePositionPatient != d.ImagePositionPatient for d in series]):
+        if isUseful(MethodType.PatientLocation):
             methods.append(MethodType.PatientLocation)
-        elif isMethodValid(series, MethodType.SliceLocation) and \
-                any([series[0].SliceLocation != d.SliceLocation for d in series]):
+        elif isUseful(MethodType.SliceLocation):
             methods.append(MethodType.SliceLocation)
 
         # Check for trigger time or acquisition date time
-        if isMethodValid(series, MethodType.TriggerTime) \
-                and any([series[0].TriggerTime != d.TriggerTime for d in series]):
+        if isUseful(MethodType.TriggerTime):
             methods.append(MethodType.TriggerTime)
-        elif isMethodValid(series, MethodType.AcquisitionDateTime) \
-                and any([series[0].AcquisitionDateTime != d.AcquisitionDateTime for d in series]):
+        elif isUseful(MethodType.AcquisitionDateTime):
             methods.append(MethodType.AcquisitionDateTime)
 
         # If nothing has worked until now, try image number
-        if len(methods) == 0 and isMethodValid(series, MethodType.ImageNumber) \
-                and any([series[0].InstanceNumber != d.InstanceNumber for d in series]):
+        if len(methods) == 0 and isUseful(MethodType.ImageNumber):
             methods.append(MethodType.ImageNumber)
 
     if len(methods) == 0:
@@ -237,6 +198,98 @@ def getBestMethods(series):
     return methods
 
 
+# Summary of a method for a series
+# valid is whether every dataset in the series has the tags for the method
+# varies is whether the values of the method differ between datasets in the series
+# values is an array of the sort key of the method for each dataset, None if the method is not valid
+MethodSummary = namedtuple('MethodSummary', ['valid', 'varies', 'values'])
+
+
+def getSequenceValue(dataset, sequenceKeyword, keyword):
+    """Retrieve a value from the first item of a sequence in a dataset
+
+    Parameters
+    ----------
+    dataset : pydicom.Dataset
+    sequenceKeyword : str
+        Keyword of the sequence
+    keyword : str
+        Keyword of the value to retrieve from the first item of the sequence
+
+    Returns
+    -------
+    Object
+        Value from the sequence item, None if the sequence is empty or missing or if the value is missing
+    """
+
+    sequence = dataset.get(sequenceKeyword)
+
+    return sequence[0].get(keyword) if sequence else None
+
+
+# Column in the series metadata table that contains the values for each method
+METHOD_COLUMNS = {
+    MethodType.SliceLocation: 'sliceLocations',
+    MethodType.PatientLocation: 'positions',
+    MethodType.TriggerTime: 'triggerTimes',
+    MethodType.AcquisitionDateTime: 'acquisitionDateTimes',
+    MethodType.ImageNumber: 'instanceNumbers',
+    MethodType.StackID: 'stackIDs',
+    MethodType.StackPosition: 'inStackPositions',
+    MethodType.TemporalPositionIndex: 'temporalPositionIndices',
+    MethodType.FrameAcquisitionNumber: 'frameAcquisitionNumbers',
+    MethodType.MFPatientLocation: 'positions',
+    MethodType.MFAcquisitionDateTime: 'acquisitionDateTimes',
+    MethodType.CardiacTriggerTime: 'cardiacTriggerTimes',
+    MethodType.CardiacPercentage: 'cardiacPercentages',
+}
+
+
+def getMethodSummary(series):
+    """Retrieve a summary of which methods are valid for a series and whether their values vary
+
+    The summary is created from the metadata table of the series, see :attr:`Series.metadata`, for all methods that
+    match whether the series is multi-frame or not. The summary is cached in the series and is reused until datasets
+    are added or removed from the series. If datasets are modified in place, :meth:`Series.clearCache` should be called.
+
+    Parameters
+    ----------
+    series : Series
+
+    Returns
+    -------
+    dict(MethodType, MethodSummary)
+        Summary for each method that matches whether the series is multi-frame or not
+    """
+
+    if series._methodSummary is not None:
+        return series._methodSummary
+
+    metadata = series.metadata
+    summary = {}
+
+    for method in MethodType:
+        if method == MethodType.Unknown or method.isMultiFrame != series.isMultiFrame:
+            continue
+
+        # Method is valid if every dataset has a value for it
+        column = getattr(metadata, METHOD_COLUMNS[method])
+        valid = len(column) > 0 and not np.isnan(column).any()
+
+        if method in [MethodType.PatientLocation, MethodType.MFPatientLocation]:
+            # Location methods also require every dataset to have the same image orientation
+            valid = valid and isOrientationUniform(metadata.orientations)
+            values = getZPositions(metadata.orientations[0], column) if valid else None
+        else:
+            values = column if valid else None
+
+        summary[method] = MethodSummary(valid, valid and bool((column != column[0]).any()), values)
+
+    series._methodSummary = summary
+
+    return summary
+
+
 def getZPositionsFromPatientInfo(series):
     """Calculates slice location from the Image Orientation/Position fields
 
@@ -265,22 +318,9 @@ def getZPositionsFromPatientInfo(series):
 
     # We assume that the image orientations are the same throughout the entire series
     # This **should** be checked before calling this function (such as in isMethodValid)
-    if series.isMultiFrame:
-        imageOrientation = series[0].PlaneOrientationSequence[0].ImageOrientationPatient
-        imagePositions = [d.PlanePositionSequence[0].ImagePositionPatient for d in series]
-    else:
-        imageOrientation = series[0].ImageOrientationPatient
-        imagePositions = [d.ImagePositionPatient for d in series]
-
-    # Row cosines is first 3 elements, column cosines is last 3 elements of array
-    rowCosines = np.array(imageOrientation[:3])
-    colCosines = np.array(imageOrientation[3:])
-
-    # Get cross product of row and column cosines (gets normal to row/column cosines)
-    zCosines = np.cross(rowCosines, colCosines)
+    metadata = series.metadata
 
-    # Slice location is dot product of slice cosines and the image patient position
-    return [np.dot(zCosines, position) for position in imagePositions]
+    return list(getZPositions(metadata.orientations[0], metadata.positions))
 
 
 def datasetUpdateOrRemove(dataset, key, value):
@@ -300,9 +340,9 @@ def datasetUpdateOrRemove(dataset, key, value):
 
 
 def getSpacingDims(coordinates, warn=True, shapeTolerance=0.01, spacingTolerance=0.10):
-    """Takes 2D list of coordinates and returns dimensional size and spacing
+    """Takes 2D array of coordinates and returns dimensional size and spacing
 
-    :obj:`coordinates` is a 2D list where the internal lists represent the coordinate for a given dimension. An example
+    :obj:`coordinates` is a 2D array or list where each row represents the coordinate for a given dimension. An example
     setup for the variable for a 2D image would be [[x1, x2, x3], [y1, y2, y3]] where x/y are each coordinate pair.
 
     The coordinates should be in order such that the last dimension varies the quickest.
@@ -345,8 +385,8 @@ def getSpacingDims(coordinates, warn=True, shapeTolerance=0.01, spacingTolerance
 
     Parameters
     ----------
-    coordinates : list(list(float))
-        2D list where the first list contains a list of coordinates for each dimension
+    coordinates : numpy.ndarray or list(list(float))
+        2D array of shape (M, N) or list containing the N coordinates for each of the M dimensions
     warn : bool, optional
         Whether to warn or raise an exception for non-uniform grid spacing
     shapeTolerance : float, optional
@@ -379,7 +419,7 @@ def getSpacingDims(coordinates, warn=True, shapeTolerance=0.01, spacingTolerance
     spacing = []
 
     # Loop through each list in coordinates (in example, there is 3 lists)
-    for x in coordinates:
+    for dimension, x in enumerate(coordinates):
         # Difference between each preceding element
         # For the second column, this would be:
         #    [0, 0, 0, 0, 2.5, 0, 0, 0, 0, 2.5, 0, 0, 0, 0, -5.0, ...]
@@ -399,11 +439,11 @@ def getSpacingDims(coordinates, warn=True, shapeTolerance=0.01, spacingTolerance
             if not np.allclose(nzIndicesDiff, nzIndicesDiff[0], atol=0.0, rtol=shapeTolerance):
                 if warn:
                     logger.warning('Dims are not uniform, greater than 1% tolerance')
-                    logger.debug('Dimension #%i key values: %s' % (coordinates.index(x) + 1, x))
+                    logger.debug('Dimension #%i key values: %s' % (dimension + 1, x))
                     logger.debug('Location of non-zero changes in: %s' % nzIndices)
                     logger.debug('Spacing Differences: %s' % nzIndicesDiff)
                 else:
-                    logger.debug('Dimension #%i key values: %s' % (coordinates.index(x) + 1, x))
+                    logger.debug('Dimension #%i key values: %s' % (dimension + 1, x))
                     logger.debug('Location of non-zero changes in: %s' % nzIndices)
                     logger.debug('Spacing Differences: %s' % nzIndicesDiff)
                     raise Exception('Dims are not uniform, greater than 1% tolerance')
@@ -447,13 +487,13 @@ def getSpacingDims(coordinates, warn=True, shapeTolerance=0.01, spacingTolerance
         if not np.allclose(stepAmount, expectedStepAmount, atol=0.0, rtol=spacingTolerance):
             if warn:
                 logger.warning('Spacing is not uniform, greater than 10% tolerance')
-                logger.debug('Dimension #%i key values: %s' % (coordinates.index(x) + 1, x))
+                logger.debug('Dimension #%i key values: %s' % (dimension + 1, x))
                 logger.debug('Location of non-zero changes in: %s' % nzIndices)
                 logger.debug('Step amount at each transition: %s' % stepAmount)
                 logger.debug('Expected step amounts at each transition: %s' % expectedStepAmount)
                 logger.debug('Shape is %i, spacing is %f' % (shape[-1], spacing[-1]))
             else:
-                logger.debug('Dimension #%i key values: %s' % (coordinates.index(x) + 1, x))
+                logger.debug('Dimension #%i key values: %s' % (dimension + 1, x))
                 logger.debug('Location of non-zero changes in: %s' % nzIndices)
                 logger.debug('Step amount at each transition: %s' % stepAmount)
                 logger.debug('Expected step amounts at each transition: %s' % expectedStepAmount)
@@ -482,3 +522,92 @@ def getSpacingDims(coordinates, warn=True, shapeTolerance=0.01, spacingTolerance
                             'additional sorting methods')
 
     return shape, spacing
+
+
+def openDICOMFile(filename, implicitVR=False):
+    """Open a file for reading if it is a DICOM file
+
+    The start of the file is checked using :meth:`isDICOMHeader` and the file is returned positioned at the start, so
+    the check and the read share the same open.
+
+    Parameters
+    ----------
+    filename : str
+        Filename of the file to open
+    implicitVR : bool, optional
+        See :meth:`isDICOMHeader` for more information on this parameter
+
+    Returns
+    -------
+    file-like or None
+        File opened in binary mode, which must be closed by the caller. None if the file cannot be opened or does not
+        appear to be a DICOM file
+    """
+
+    try:
+        file = open(filename, 'rb')
+    except OSError:
+        return None
+
+    if not isDICOMHeader(file.read(132), implicitVR):
+        file.close()
+        return None
+
+    file.seek(0)
+    return file
+
+
+def isDICOMHeader(header, implicitVR=False):
+    """Check whether the first 132 bytes of a file are the start of a DICOM file
+
+    Only the first 132 bytes are needed to check for the 128-byte preamble followed by the "DICM" prefix, which allows
+    other files to be skipped quickly. Some files do not have the preamble and prefix and start with a data element
+    instead, either an explicit VR little endian element of the file meta information (group 0x0002) or, for older
+    files, an implicit VR little endian data element. These are only detected when :obj:`implicitVR` is set since the
+    check is a heuristic.
+
+    Parameters
+    ----------
+    header : bytes
+        First 132 bytes of the file, or the entire file if it is shorter
+    implicitVR : bool, optional
+        Whether to check if the file starts with a data element when the preamble and "DICM" prefix are missing
+        (default is False). The file is accepted if the first element belongs to group 0x0002 and has a valid VR, or
+        belongs to group 0x0008 and has a reasonable even length.
+
+    Returns
+    -------
+    bool
+        True if the file appears to be a DICOM file, False otherwise
+    """
+
+    if header[128:132] == b'DICM':
+        return True
+    elif not implicitVR or len(header) < 8:
+        return False
+
+    group, _, length = struct.unpack('<HHI', header[:8])
+
+    # The file meta information is always explicit VR little endian, so the element is followed by a two letter VR
+    if group == 0x0002:
+        VR = header[4:6]
+        return VR.isalpha() and VR.isupper()
+
+    return group == 0x0008 and length < 0x1000 and length % 2 == 0
+
+
+def isDICOMDIRDataset(dataset):
+    """Check whether a dataset was read from a DICOMDIR file using its Media Storage SOP Class UID
+
+    Parameters
+    ----------
+    dataset : pydicom.Dataset
+
+    Returns
+    -------
+    bool
+    """
+
+    fileMeta = getattr(dataset, 'file_meta', None)
+
+    return fileMeta is not None and fileMeta.get('MediaStorageSOPClassUID') == MEDIA_STORAGE_DIRECTORY_UID
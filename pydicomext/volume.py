@@ -1,3 +1,12 @@
+import json
+import os
+
+import numpy as np
+
+# Version of the sidecar file written by Volume.save, bump this whenever the format changes
+VOLUME_FORMAT_VERSION = 1
+
+
 class Volume():
     def __init__(self, data=None, space=None, orientation=None, origin=None, spacing=None):
         self.data = data
@@ -6,6 +15,75 @@ class Volume():
         self.origin = origin
         self.spacing = spacing
 
+    def save(self, filename):
+        """Save the volume to a NumPy file along with a JSON sidecar file containing the volume information
+
+        The data is saved in the NumPy format (.npy) and the space, orientation, origin and spacing are saved in a JSON
+        file with the same name but a .json extension. The volume can be loaded again using :meth:`Volume.load`.
+
+        If the data is a :class:`LazyArray`, then all of the images are decoded before saving.
+
+        Parameters
+        ----------
+        filename : str
+            Filename of the NumPy file, the .npy extension is added if not present
+        """
+
+        dataFilename, infoFilename = getVolumeFilenames(filename)
+
+        np.save(dataFilename, np.asarray(self.data))
+
+        info = {
+            'version': VOLUME_FORMAT_VERSION,
+            'space': self.space,
+            'orientation': None if self.orientation is None else np.asarray(self.orientation).tolist(),
+            'origin': None if self.origin is None else np.asarray(self.origin).tolist(),
+            'spacing': None if self.spacing is None else np.asarray(self.spacing).tolist(),
+        }
+
+        with open(infoFilename, 'w') as file:
+            json.dump(info, file, indent=4)
+
+    @staticmethod
+    def load(filename, mmap=True):
+        """Load a volume that was saved using :meth:`Volume.save`
+
+        Parameters
+        ----------
+        filename : str
+            Filename of the NumPy file, the .npy extension is added if not present
+        mmap : bool, optional
+            Whether to memory-map the data rather than reading it into memory (default is True). A memory-mapped volume
+            is loaded almost instantly regardless of its size and the data is read from the file as it is accessed. The
+            memory-mapped data is read-only.
+
+        Raises
+        ------
+        Exception
+            If the sidecar file was written by a newer version of the format
+
+        Returns
+        -------
+        Volume
+            Volume that was loaded
+        """
+
+        dataFilename, infoFilename = getVolumeFilenames(filename)
+
+        with open(infoFilename, 'r') as file:
+            info = json.load(file)
+
+        if info.get('version', 0) > VOLUME_FORMAT_VERSION:
+            raise Exception('Volume file was saved with a newer format version (%i): %s' %
+                            (info['version'], infoFilename))
+
+        data = np.load(dataFilename, mmap_mode='r' if mmap else None)
+
+        orientation, origin, spacing = [None if info[key] is None else np.array(info[key])
+                                        for key in ['orientation', 'origin', 'spacing']]
+
+        return Volume(data, info['space'], orientation, origin, spacing)
+
     def __str__(self):
         return """Volume
     Space: %s
@@ -16,3 +94,25 @@ class Volume():
 
     def __repr__(self):
         return self.__str__()
+
+
+def getVolumeFilenames(filename):
+    """Retrieve the filenames of the data and sidecar files of a saved volume
+
+    Parameters
+    ----------
+    filename : str
+        Filename of the NumPy file, with or without the .npy extension
+
+    Returns
+    -------
+    str
+        Filename of the NumPy file containing the data
+    str
+        Filename of the JSON file containing the volume information
+    """
+
+    if not filename.endswith('.npy'):
+        filename += '.npy'
+
+    return filename, os.path.splitext(filename)[0] + '.json'